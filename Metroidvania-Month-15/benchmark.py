@@ -0,0 +1,159 @@
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+import numpy
+
+import argparse, json, random, sys, time
+
+"""
+
+Headless benchmark for the Metroidvania loop
+
+python benchmark.py "res/levels/level 1.json" --frames 1200 --out results.json
+
+The timeline is a list of [first frame, last frame, [key names]] entries, keys are held
+for every frame in the range (inclusive) and keydown/keyup events are sent on the edges.
+It repeats every timelineLength frames.
+
+"""
+
+DEFAULT_TIMELINE = {
+    "timelineLength" : 240,
+    "keys" : [
+        [0, 119, ["right"]],
+        [120, 239, ["left"]],
+        [0, 239, ["x"]],
+        [10, 25, ["c"]],
+        [70, 90, ["c"]],
+        [130, 145, ["c"]],
+        [190, 210, ["c"]]
+    ]
+}
+
+class ScriptedKeys:
+    def __init__(self):
+        self.held = set()
+
+    def __getitem__(self, key):
+        return key in self.held
+
+class Timeline:
+    def __init__(self, data):
+        self.length = data["timelineLength"]
+        self.keys = [(start, end, [pygame.key.key_code(name) for name in names]) for start, end, names in data["keys"]]
+
+    def heldAt(self, frame):
+        frame %= self.length
+        held = set()
+        for start, end, keys in self.keys:
+            if start <= frame <= end:    held.update(keys)
+        return held
+
+def percentiles(times):
+    times = sorted(times)
+    def at(p):
+        return times[min(len(times) - 1, int(p / 100 * len(times)))]
+    return {
+        "mean" : sum(times) / len(times),
+        "p50" : at(50),
+        "p90" : at(90),
+        "p95" : at(95),
+        "p99" : at(99),
+        "max" : times[-1]
+    }
+
+def run(levelPath, frames=600, delta=1/60, timeline=None, seed=0, warmup=30, batch=False):
+    pygame.mixer.pre_init(44100, -16, 2, 512)
+    pygame.init()
+    win = pygame.display.set_mode((320, 180), 0, 8)
+
+    # Particles draw from numpy.random as well
+    random.seed(seed)
+    numpy.random.seed(seed)
+
+    keys = ScriptedKeys()
+    pygame.key.get_pressed = lambda: keys
+
+    from src.screens.screenmanager import ScreenManager
+    from src.screens.level import Level
+    from src.entities.enemymanager import EnemyManager
+
+    EnemyManager.batchPhysics = batch
+
+    timeline = Timeline(DEFAULT_TIMELINE if timeline is None else timeline)
+
+    loadStart = time.perf_counter()
+    screenManager = ScreenManager(Level(levelPath))
+    loadTime = time.perf_counter() - loadStart
+
+    updateTimes, drawTimes = [], []
+    tierTotals = {}
+    for frame in range(warmup + frames):
+        held = timeline.heldAt(frame)
+        for key in held - keys.held:
+            screenManager.keydown(pygame.event.Event(pygame.KEYDOWN, key=key))
+        for key in keys.held - held:
+            screenManager.keyup(pygame.event.Event(pygame.KEYUP, key=key))
+        keys.held = held
+        pygame.event.pump()
+
+        start = time.perf_counter()
+        screenManager.update(delta)
+        mid = time.perf_counter()
+        win.fill((0,0,0))
+        screenManager.draw(win)
+        end = time.perf_counter()
+
+        if frame >= warmup:
+            updateTimes.append((mid - start) * 1000)
+            drawTimes.append((end - mid) * 1000)
+
+            enemyManager = getattr(screenManager.curScreen, "enemyManager", None)
+            if enemyManager is not None:
+                for tier, count in enemyManager.tierCounts.items():
+                    tierTotals[tier.name] = tierTotals.get(tier.name, 0) + count
+
+    pygame.quit()
+
+    return {
+        "level" : levelPath,
+        "frames" : frames,
+        "delta" : delta,
+        "seed" : seed,
+        "batch" : batch,
+        "loadMs" : loadTime * 1000,
+        "updateMs" : percentiles(updateTimes),
+        "drawMs" : percentiles(drawTimes),
+        "enemyTiers" : {tier : total / frames for tier, total in tierTotals.items()}
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a level headless with scripted input and report frame times.")
+    parser.add_argument("level", nargs='+', help="level json files")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--delta", type=float, default=1/60)
+    parser.add_argument("--warmup", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeline", help="json file with a key timeline, see DEFAULT_TIMELINE")
+    parser.add_argument("--batch", action="store_true", help="move ground and slow enemies with the batched physics")
+    parser.add_argument("--out", help="write the results here instead of stdout")
+    args = parser.parse_args()
+
+    timeline = None
+    if args.timeline is not None:
+        with open(args.timeline, 'r') as f:
+            timeline = json.loads(f.read())
+
+    results = [run(level, args.frames, args.delta, timeline, args.seed, args.warmup, args.batch) for level in args.level]
+
+    if args.out is None:
+        json.dump(results, sys.stdout, indent=4)
+        print()
+    else:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=4)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,313 @@
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+import numpy
+
+import argparse, json, math, random
+
+from benchmark import ScriptedKeys, Timeline, DEFAULT_TIMELINE
+
+"""
+
+Regression check for Entity.resolveCollision against the resolver before it (resolveCollisionOld below)
+
+python collisionregression.py
+python collisionregression.py --record collisionregression.json
+
+The steps in collisionregression.json are replayed by default. They were recorded by playing the
+levels with the benchmark key timeline at 1/60 and at the 0.1s delta clamp with a couple of seeds,
+drawing every frame so the enemy tiers follow the real screen, and only steps that come within 2px
+of a rect are kept.
+--record plays the levels again and writes a new file.
+
+Every step goes through both resolvers from the same state. The new result has to hold up on its
+own: it only moves over rects the start already overlapped, only stops against an edge, and on an
+axis it doesn't stop on it moves the full distance and ends clear of every rect. Where the two
+differ, it is counted as tunnelling when the old resolver went all the way over a rect without
+overlapping it before or after, as old invalid when the old result fails the same checks (the last
+of several rects it hit won, not the nearest), and as pushed out when the start already overlapped
+something.
+Anything else raises an AssertionError, and so do fast entities (kickPower, 350 with the 0.1s delta
+clamp) going through one tile thick walls.
+
+"""
+
+FIXTURE = "collisionregression.json"
+
+def resolveCollisionOld(entity, delta, tilemap=None, colRects=None):
+    # Entity.resolveCollision before the swept resolver
+    if colRects is None:    colRects = []
+    if tilemap is not None:
+        tilemap.getEntityColRects(entity.pos, entity.width, entity.height, entity.vel * delta, colRects)
+
+    entity.collisionDir = 0b0000
+
+    entity.pos.x += entity.vel.x * delta
+    entity.updateRectPos()
+    indices = entity.rect.collidelistall(colRects)
+
+    for i in indices:
+        if entity.vel.x > 0:
+            entity.pos.x = colRects[i].x - entity.width
+            entity.vel.x = 0
+            entity.collisionDir |= 0b0100
+        elif entity.vel.x < 0:
+            entity.pos.x = colRects[i].right
+            entity.vel.x = 0
+            entity.collisionDir |= 0b0001
+
+    entity.pos.y += entity.vel.y * delta
+    entity.updateRectPos()
+    indices = entity.rect.collidelistall(colRects)
+
+    for i in indices:
+        if entity.vel.y > 0:
+            entity.pos.y = colRects[i].y - entity.height
+            entity.vel.y = 0
+            entity.collisionDir |= 0b0010
+        elif entity.vel.y < 0:
+            entity.pos.y = colRects[i].bottom
+            entity.vel.y = 0
+            entity.collisionDir |= 0b1000
+
+    entity.updateRectPos()
+
+def clamp(p, v):
+    return math.ceil(p) if v > 0 else int(p)
+
+def loadTilemap(levelPath):
+    from src.utils.tilemap import Tilemap
+
+    tilemap = Tilemap(16, [])
+    tilemap.loadLevel(levelPath)
+    return tilemap
+
+def levelRects(tilemap):
+    return [rect for rects in tilemap.chunks.values() for rect in rects]
+
+def record(levelPath, frames, delta, seed):
+    pygame.mixer.pre_init(44100, -16, 2, 512)
+    pygame.init()
+    win = pygame.display.set_mode((320, 180), 0, 8)
+
+    # Particles draw from numpy.random as well
+    random.seed(seed)
+    numpy.random.seed(seed)
+
+    keys = ScriptedKeys()
+    pygame.key.get_pressed = lambda: keys
+
+    from src.screens.screenmanager import ScreenManager
+    from src.screens.level import Level
+    from src.entities.entity import Entity
+
+    steps = []
+    resolveCollision = Entity.resolveCollision
+    def recordStep(self, delta, tilemap=None, colRects=None):
+        steps.append([self.pos.x, self.pos.y, self.vel.x, self.vel.y, self.width, self.height, delta, \
+            [tuple(r) for r in colRects] if colRects else []])
+        return resolveCollision(self, delta, tilemap, colRects)
+    Entity.resolveCollision = recordStep
+
+    timeline = Timeline(DEFAULT_TIMELINE)
+    screenManager = ScreenManager(Level(levelPath))
+    try:
+        for frame in range(frames):
+            held = timeline.heldAt(frame)
+            for key in held - keys.held:
+                screenManager.keydown(pygame.event.Event(pygame.KEYDOWN, key=key))
+            for key in keys.held - held:
+                screenManager.keyup(pygame.event.Event(pygame.KEYUP, key=key))
+            keys.held = held
+            screenManager.update(delta)
+            # Level.draw sets the screen rect the enemy tiers are based on
+            screenManager.draw(win)
+    finally:
+        Entity.resolveCollision = resolveCollision
+
+    # Only steps near something, once each, with the colRects lists shared between them
+    solid = levelRects(loadTilemap(levelPath))
+    rectSets, kept = {}, {}
+    for x, y, vx, vy, w, h, d, rects in steps:
+        area = pygame.Rect(math.floor(min(x, x + vx * d)) - 2, math.floor(min(y, y + vy * d)) - 2, abs(vx * d) + w + 5, abs(vy * d) + h + 5)
+        if area.collidelist(solid) == -1 and area.collidelist(rects) == -1:
+            continue
+        rectSet = rectSets.setdefault(tuple(rects), len(rectSets))
+        kept[(x, y, vx, vy, w, h, d, rectSet)] = True
+
+    return {"level" : levelPath, "delta" : delta, "seed" : seed, "rectSets" : [list(map(list, rects)) for rects in rectSets], "steps" : list(kept)}
+
+def resolveBoth(step, tilemap, rectSets):
+    from src.entities.entity import Entity
+
+    x, y, vx, vy, w, h, delta, rectSet = step
+    results = []
+    for old in (True, False):
+        e = Entity(x, y, w, h)
+        e.vel.update(vx, vy)
+        colRects = [pygame.Rect(r) for r in rectSets[rectSet]]
+        if old:
+            resolveCollisionOld(e, delta, tilemap, colRects)
+        else:
+            e.collisionDir = e.resolveCollision(delta, tilemap, colRects)
+            e.updateRectPos()
+        results.append((tuple(e.pos), tuple(e.vel), e.collisionDir, tuple(e.rect)))
+    return results
+
+def phaseRects(step, result):
+    # Where the rect was after the x move and after the y move, and the areas each move went over
+    x, y, vx, vy, w, h = step[:6]
+    startX, startY = clamp(x, vx), clamp(y, vy)
+    endX, endY = result[3][0], result[3][1]
+    afterX = pygame.Rect(endX, startY, w, h)
+    afterY = pygame.Rect(endX, endY, w, h)
+    sweptX = pygame.Rect(min(startX, endX), startY, abs(endX - startX) + w, h)
+    sweptY = pygame.Rect(endX, min(startY, endY), w, abs(endY - startY) + h)
+    return ((afterX, sweptX), (afterY, sweptY))
+
+AXIS_BITS = ((0b0100, 0b0001), (0b0010, 0b1000)) # Forward, back
+
+def checkResult(step, result, rects, inside):
+    # Why result is not a resolved step, or None
+    x, y, vx, vy, w, h, delta = step[:7]
+    pos, vel, collisionDir = result[0], result[1], result[2]
+
+    for axis, (after, swept) in enumerate(phaseRects(step, result)):
+        if any(i not in inside for i in swept.collidelistall(rects)):
+            return f"moved into a rect on axis {axis}"
+
+        v = (vx, vy)[axis]
+        forward, back = AXIS_BITS[axis]
+        bits = collisionDir & (forward | back)
+        if bits == 0:
+            if vel[axis] != v or pos[axis] != (x, y)[axis] + v * delta:
+                return f"didn't move the full distance on axis {axis}"
+            if v != 0 and after.collidelist(rects) != -1:
+                return f"ended inside a rect on axis {axis} without stopping"
+        elif v == 0 or bits != (forward if v > 0 else back):
+            return f"collision bits {collisionDir:04b} don't match the velocity"
+        elif vel[axis] != 0:
+            return f"stopped on axis {axis} without zeroing the velocity"
+        else:
+            sign = 1 if v > 0 else -1
+            ahead = after.move(sign, 0) if axis == 0 else after.move(0, sign)
+            if ahead.collidelist(rects) == -1:
+                return f"stopped on axis {axis} short of any edge"
+    return None
+
+def crossed(step, result, rects):
+    # A rect the move went all the way over, overlapping neither where the move started nor where it ended
+    x, y, vx, vy, w, h = step[:6]
+    before = pygame.Rect(clamp(x, vx), clamp(y, vy), w, h)
+    for after, swept in phaseRects(step, result):
+        for i in swept.collidelistall(rects):
+            if not before.colliderect(rects[i]) and not after.colliderect(rects[i]):
+                return True
+        before = after
+    return False
+
+def check(trajectory):
+    tilemap = loadTilemap(trajectory["level"])
+    solid = levelRects(tilemap)
+    rectSets = trajectory["rectSets"]
+
+    counts = {"same" : 0, "tunnelling" : 0, "old invalid" : 0, "pushed out" : 0}
+    failures = []
+    for step in trajectory["steps"]:
+        old, new = resolveBoth(step, tilemap, rectSets)
+
+        x, y, vx, vy, w, h = step[:6]
+        rects = solid + [pygame.Rect(r) for r in rectSets[step[7]]]
+        inside = set(pygame.Rect(clamp(x, vx), clamp(y, vy), w, h).collidelistall(rects))
+
+        reason = checkResult(step, new, rects, inside)
+        if reason is not None:
+            failures.append((step, old, new, reason))
+        elif old == new:
+            counts["same"] += 1
+        elif crossed(step, old, rects):
+            counts["tunnelling"] += 1
+        elif checkResult(step, old, rects, inside) is not None:
+            counts["old invalid"] += 1
+        elif inside:
+            counts["pushed out"] += 1
+        else:
+            failures.append((step, old, new, "differs from the old resolver"))
+
+    line = f"{trajectory['level']:>28} delta {trajectory['delta']:.3f} seed {trajectory['seed']:>2} steps {len(trajectory['steps']):>6}"
+    for name, count in counts.items():
+        line += f" | {name} {count:>5}"
+    print(line + f" | failures {len(failures):>5}")
+    return failures
+
+def checkThinWalls(speeds, delta):
+    from src.utils.tilemap import Tilemap
+    from src.entities.entity import Entity
+
+    # A one tile wall at x 160 and a one tile floor at y 160
+    tilemap = Tilemap(16, [])
+    tilemap.chunks = {(1, 0): [pygame.Rect(160, 0, 16, 96)], (0, 1): [pygame.Rect(0, 160, 96, 16)]}
+    tilemap.buildSolidGrid()
+
+    failures = []
+    for speed in speeds:
+        counts = []
+        for old in (True, False):
+            through = 0
+            for offset in range(16):
+                for axis, start in ((0, (160 - 12 - offset, 40)), (1, (40, 160 - 16 - offset))):
+                    e = Entity(start, 12, 16)
+                    e.vel[axis] = speed
+                    if old:
+                        resolveCollisionOld(e, delta, tilemap, [])
+                    else:
+                        e.resolveCollision(delta, tilemap, [])
+                    through += e.pos[axis] >= 176
+            counts.append(through)
+        print(f"{'thin walls':>28} delta {delta:.3f} speed {speed:>6} | old through {counts[0]:>3}/32 | new through {counts[1]:>3}/32")
+        if counts[1] != 0:
+            failures.append(f"{counts[1]}/32 went through a one tile wall at speed {speed}")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the swept collision resolver with the old one on recorded trajectories.")
+    parser.add_argument("level", nargs='*', default=["res/levels/level 0.json", "res/levels/level 1.json", "res/levels/level 2.json", "res/levels/bosslevel.json"], help="levels to record with --record")
+    parser.add_argument("--frames", type=int, default=1200)
+    parser.add_argument("--deltas", type=float, nargs='+', default=[1/60, 0.1])
+    parser.add_argument("--seeds", type=int, nargs='+', default=[0, 4])
+    parser.add_argument("--record", help="record the levels again and write the trajectories here")
+    parser.add_argument("--trajectories", default=FIXTURE, help="trajectories to replay")
+    parser.add_argument("--speeds", type=float, nargs='+', default=[200, 350, 500])
+    parser.add_argument("--verbose", type=int, default=5, help="failures to print")
+    args = parser.parse_args()
+
+    if args.record is not None:
+        trajectories, seen = [], set()
+        for seed in args.seeds:
+            for delta in args.deltas:
+                for level in args.level:
+                    trajectory = record(level, args.frames, delta, seed)
+                    # Most levels play out the same whatever the seed, only keep the ones that don't
+                    key = json.dumps([level, delta, trajectory["rectSets"], trajectory["steps"]])
+                    if key not in seen:
+                        seen.add(key)
+                        trajectories.append(trajectory)
+        with open(args.record, 'w') as f:
+            json.dump(trajectories, f, separators=(',', ':'))
+    else:
+        with open(args.trajectories, 'r') as f:
+            trajectories = json.loads(f.read())
+
+    pygame.init()
+    failures = []
+    for trajectory in trajectories:
+        failures += [f"{trajectory['level']} step {step[:7]}: {reason}\n    old {old}\n    new {new}" for step, old, new, reason in check(trajectory)]
+    failures += checkThinWalls(args.speeds, 0.1)
+
+    if failures:
+        raise AssertionError(f"{len(failures)} collision regressions\n" + "\n".join(failures[:args.verbose]))
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,4 @@
-def singleton(class_):
-    instances = {}
-    def getinstance(*args, **kwargs):
-        if class_ not in instances:
-            instances[class_] = class_(*args, **kwargs)
-        return instances[class_]
-    return getinstance
+from src.utils.common import singleton
 
 @singleton
 class AudioSettings():
@@ -4,8 +4,8 @@ from pygame.math import Vector2
 import random
 
 from src.entities.entity import Entity
-from src.entities.projectile import Projectile
 from src.utils.animation import Animation
+from src.utils.spritecache import SpriteCache
 
 class Boss(Entity):
     def __init__(self, *args, **kwargs):
@@ -28,11 +28,13 @@ class Boss(Entity):
         self.health = self.healths[self.phase]
         self.damageTimer = 0
 
+        SpriteCache().preload(self.imgs, sizes=[(16*2**phase, 16*2**phase) for phase in range(len(self.healths))])
+
         self.invincible = False
 
         self.shootRate = 0.5
         self.shootTimer = self.shootRate
-        self.projectiles = []
+        self.projectiles = kwargs["projectiles"]
 
         self.enemySpawnTimer = 5
         self.spawnEnemy = False
@@ -45,8 +47,6 @@ class Boss(Entity):
         self.damageSurf.set_alpha(128)
     
     def collide(self, other : pygame.Rect):
-        for proj in self.projectiles:
-            if other.collidepoint(proj.pos):    return True
         return self.rect.colliderect(other)
     
     # Return whether or not it is alive
@@ -90,7 +90,7 @@ class Boss(Entity):
         if self.collisionDir & 0b0010 == 0: drawIndex = 0
 
         scale = 2**self.phase
-        win.blit(pygame.transform.scale(pygame.transform.flip(self.imgs[drawIndex], self.dir == -1, False), (16*scale, 16*scale)), self.pos-scroll+(-2*scale, 0))
+        win.blit(SpriteCache().get(self.imgs[drawIndex], self.dir == -1, size=(16*scale, 16*scale)), self.pos-scroll+(-2*scale, 0))
 
         if self.damageTimer > 0.25:
             self.damageSurf.fill((255,0,0))
@@ -99,8 +99,6 @@ class Boss(Entity):
             self.damageSurf.fill((255,255,255))
             win.blit(self.damageSurf, self.pos-scroll+(-scale, -scale))
 
-        for proj in self.projectiles:
-            proj.draw(win, scroll)
         #super().draw(win, scroll)
     
     def update(self, delta, tilemap, player, colRects=None):
@@ -117,17 +115,12 @@ class Boss(Entity):
                 self.pos.x += self.vel.x * delta * 2
                 self.updateRectPos()
 
-            for i in range(len(self.projectiles))[::-1]:
-                self.projectiles[i].update(delta)
-                if tilemap.collidePoint(self.projectiles[i].pos):
-                    self.projectiles.pop(i)
-
         self.vel.x = self.speed * self.dir
 
         if self.phase == 1 and self.center.distance_squared_to(player.center) < 62500: # Radius: 250
             if self.shootTimer <= 0:
                 self.shootTimer = self.shootRate
-                self.projectiles.append(Projectile(self.center, player.center, speed=16*5))
+                self.projectiles.spawn(self.center, player.center, speed=16*5)
             else:
                 self.shootTimer -= delta
 
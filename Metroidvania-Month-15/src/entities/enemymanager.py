@@ -1,10 +1,12 @@
 import pygame
 from pygame.math import Vector2
 
-from src.utils.common import loadSpriteSheet
+from src.utils.spritecache import SpriteCache
+from src.utils.assetcache import AssetCache
 import src.screens
 from src.entities.boss import Boss
 from src.entities.enemy import *
+from src.entities.physicsbatch import PhysicsBatch
 
 from src.audiosettings import AudioSettings
 
@@ -21,9 +23,23 @@ class EnemyManager:
         "FlyingEnemies": (3, 6),
         "SlowEnemies": (0, 3)
     }
-    def __init__(self, extraData):
+    # Types whose physics is plain Entity.update, they can be moved together in a PhysicsBatch
+    batchTypes = (GroundEnemy, SlowEnemy)
+    batchPhysics = False
+
+    def __init__(self, extraData, projectileManager, fullMargin=64, coarseMargin=320, coarseStep=1/15):
         self.enemySpawns = {}
 
+        # Enemies within fullMargin of the screen update every frame, within coarseMargin every
+        # coarseStep seconds (short enough not to skip through tiles) and past that not at all
+        self.fullMargin = fullMargin
+        self.coarseMargin = coarseMargin
+        self.coarseStep = coarseStep
+        self.tierCounts = {tier: 0 for tier in Tiers}
+
+        self.physicsBatch = PhysicsBatch()
+        self.projectileManager = projectileManager
+
         for enemyType in ["GroundEnemies", "JumpingEnemies", "FlyingEnemies", "SlowEnemies"]:
             if enemyType in extraData:
                 self.enemySpawns[enemyType] = extraData[enemyType]
@@ -34,10 +50,11 @@ class EnemyManager:
         if "BossDamagePoints" in extraData:
             self.bossDamagePoints = extraData["BossDamagePoints"]
         
-        self.imgs = loadSpriteSheet("res/imgs/enemies.png", (16,16), (3,4), (1,1), 12, (0,0,0))
+        self.imgs = AssetCache().spriteSheet("res/imgs/enemies.png", (16,16), (3,4), (1,1), 12, (0,0,0), self)
+        SpriteCache().preload(self.imgs)
 
-        self.deathSound = pygame.mixer.Sound("res/sound/death.wav")
-        self.rageSound = pygame.mixer.Sound("res/sound/rage.wav")
+        self.deathSound = AssetCache().sound("res/sound/death.wav", self)
+        self.rageSound = AssetCache().sound("res/sound/rage.wav", self)
 
     def setup(self):
         self.reset = False
@@ -48,9 +65,9 @@ class EnemyManager:
             if enemyType != "Boss":
                 for pos in positions:
                     self.enemies.append(self.enemyTypes[enemyType](pos, 12, 16, \
-                        images=self.imgs[self.enemyImgs[enemyType][0]:self.enemyImgs[enemyType][1]]))
+                        images=self.imgs[self.enemyImgs[enemyType][0]:self.enemyImgs[enemyType][1]], projectiles=self.projectileManager))
             else:
-                self.boss = Boss(positions, 12, 16, images=self.imgs[0:3])
+                self.boss = Boss(positions, 12, 16, images=self.imgs[0:3], projectiles=self.projectileManager)
         
         self.bossDamageRects = [pygame.Rect(pos, (16, 16)) for pos in self.bossDamagePoints]
         self.bossDamageProgress = [16 for _ in self.bossDamageRects]
@@ -76,10 +93,10 @@ class EnemyManager:
             if self.boss.spawnEnemy:
                 self.boss.spawnEnemy = False
                 self.enemies.append(self.enemyTypes[self.boss.enemySpawnType](self.boss.enemySpawnPos, 12, 16, \
-                    images=self.imgs[self.enemyImgs[self.boss.enemySpawnType][0]:self.enemyImgs[self.boss.enemySpawnType][1]]))
+                    images=self.imgs[self.enemyImgs[self.boss.enemySpawnType][0]:self.enemyImgs[self.boss.enemySpawnType][1]], projectiles=self.projectileManager))
                 dir = self.boss.enemySpawnDir
-                self.enemies[-1].decoratorObj.dir = dir
-                self.enemies[-1].vel.x = self.enemies[-1].decoratorObj.getCurrentSpeed() * dir
+                self.enemies[-1].dir = dir
+                self.enemies[-1].vel.x = self.enemies[-1].getCurrentSpeed() * dir
 
             if not player.invincible:
                 if self.boss.collide(player.rect):
@@ -108,8 +125,9 @@ class EnemyManager:
                                 player.displayText("The shrink ray is wearing off!", 2)
                     else:
                         player.displayText("I could go up to break its invincibility")
+                hits = player.waterParticles.collideRects(self.bossDamageRects)
                 for i in range(len(self.bossDamageProgress))[::-1]:
-                    if player.waterParticles.collideRect(self.bossDamageRects[i]):
+                    if hits[i]:
                         self.bossDamageProgress[i] -= 0.25
                         if self.bossDamageProgress[i] < 3:
                             if AudioSettings().sfx:
@@ -131,13 +149,39 @@ class EnemyManager:
                 self.enemies = []
                 self.newScreen = src.screens.textscreen.TextScreen("res/levels/wintext.json")
 
+        fullRect = screenRect.inflate(self.fullMargin * 2, self.fullMargin * 2)
+        coarseRect = screenRect.inflate(self.coarseMargin * 2, self.coarseMargin * 2)
+        self.tierCounts = {tier: 0 for tier in Tiers}
+        batch, batchDeltas = [], []
         for enemy in self.enemies:
             enemy.onScreen = enemy.rect.colliderect(screenRect)
-            enemy.update(delta, player, tilemap, colRects)
+            self.updateTier(enemy, fullRect, coarseRect)
+            self.tierCounts[enemy.tier] += 1
+
+            stepDelta = None
+            if enemy.tier == Tiers.FULL:
+                stepDelta = delta
+            elif enemy.tier == Tiers.COARSE:
+                enemy.coarseDelta += delta
+                if enemy.coarseDelta >= self.coarseStep:
+                    stepDelta = enemy.coarseDelta
+                    enemy.coarseDelta = 0
+            if stepDelta is None:
+                continue
+
+            if self.batchPhysics and isinstance(enemy, self.batchTypes) and not (colRects and self.physicsBatch.touchesRects(enemy, stepDelta, colRects)):
+                if enemy.behave(stepDelta, player, tilemap):
+                    batch.append(enemy)
+                    batchDeltas.append(stepDelta)
+                enemy.updateTimers(stepDelta)
+            else:
+                enemy.update(stepDelta, player, tilemap, colRects)
+        self.physicsBatch.step(batch, batchDeltas, tilemap)
 
+        hits = player.waterParticles.collideRects([enemy.rect for enemy in self.enemies])
         for i in range(len(self.enemies))[::-1]:
             if self.enemies[i].onScreen:#screenRect.colliderect(self.enemies[i].rect):
-                if player.waterParticles.collideRect(self.enemies[i].rect):
+                if hits[i]:
                     if player.acid:
                         if self.enemies[i].damageTimer <= 0:
                             self.enemies[i].kick(player.dir * 75)
@@ -153,5 +197,18 @@ class EnemyManager:
                 if enemy.stunTimer <= 0 and enemy.collide(player.rect):#rect(player.rect):
                     self.reset = True
 
+    def updateTier(self, enemy, fullRect, coarseRect):
+        if enemy.rect.colliderect(fullRect):
+            tier = Tiers.FULL
+        elif enemy.rect.colliderect(coarseRect):
+            tier = Tiers.COARSE
+        else:
+            tier = Tiers.FROZEN
+
+        # Time left over from coarse steps is dropped, so waking up doesn't jump the enemy forward
+        if tier != enemy.tier:
+            enemy.coarseDelta = 0
+        enemy.tier = tier
+
     def getStunnedRects(self):
         return [enemy.rect for enemy in self.enemies if enemy.stunTimer > 0]
\ No newline at end of file
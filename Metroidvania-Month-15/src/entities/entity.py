@@ -3,7 +3,99 @@ from pygame.math import Vector2
 
 import math
 
+def clamp(p, v):
+    # One axis of clampedPos
+    return math.ceil(p) if v > 0 else int(p)
+
+def sweepRects(rects, axis, move, startLo, startHi, endLo, endHi, otherLo, otherHi, contact, inside):
+    # contact is the nearest edge ahead of the start, inside the shortest way back out of rects the start already overlaps
+    for r in rects:
+        if axis == 0:
+            if r.y >= otherHi or r.bottom <= otherLo:    continue
+            lo, hi = r.x, r.right
+        else:
+            if r.x >= otherHi or r.right <= otherLo:    continue
+            lo, hi = r.y, r.bottom
+        if move > 0:
+            if lo < endHi and (hi > endLo or lo >= startHi):
+                if lo >= startHi:
+                    if contact is None or lo < contact:    contact = lo
+                elif inside is None or lo > inside:    inside = lo
+        elif hi > endLo and (lo < endHi or hi <= startLo):
+            if hi <= startLo:
+                if contact is None or hi > contact:    contact = hi
+            elif inside is None or hi < inside:    inside = hi
+    return contact, inside
+
+def solidLine(tilemap, axis, cell, otherFirst, otherLast):
+    # Whether any tile from otherFirst to otherLast across the line at cell along axis is solid
+    originX, originY = tilemap.gridOrigin
+    dimX, dimY = tilemap.gridDim
+    if axis == 0:
+        x = cell - originX
+        first, last = max(otherFirst - originY, 0), min(otherLast - originY + 1, dimY)
+        if x < 0 or x >= dimX or first >= last:    return False
+        return tilemap.solidColumns.find(1, x * dimY + first, x * dimY + last) != -1
+    y = cell - originY
+    first, last = max(otherFirst - originX, 0), min(otherLast - originX + 1, dimX)
+    if y < 0 or y >= dimY or first >= last:    return False
+    return tilemap.solidBytes.find(1, y * dimX + first, y * dimX + last) != -1
+
+def sweepTiles(tilemap, axis, move, startLo, startHi, endLo, endHi, otherLo, otherHi, contact, inside):
+    # sweepRects against the solid tile grid, walking the cells out from the nearest
+    ts = tilemap.tileSize
+    otherFirst, otherLast = otherLo // ts, (otherHi - 1) // ts
+    if move > 0:
+        ahead = -(-startHi // ts) # First cell past the start
+        last = (endHi - 1) // ts
+        for cell in range(ahead, last + 1):
+            if solidLine(tilemap, axis, cell, otherFirst, otherLast):
+                if contact is None or cell * ts < contact:    contact = cell * ts
+                break
+        if contact is not None:    return contact, inside
+        for cell in range(min(ahead, last + 1) - 1, endLo // ts - 1, -1):
+            if solidLine(tilemap, axis, cell, otherFirst, otherLast):
+                if inside is None or cell * ts > inside:    inside = cell * ts
+                break
+    else:
+        ahead = startLo // ts - 1 # Last cell before the start
+        first = endLo // ts
+        for cell in range(ahead, first - 1, -1):
+            if solidLine(tilemap, axis, cell, otherFirst, otherLast):
+                if contact is None or (cell + 1) * ts > contact:    contact = (cell + 1) * ts
+                break
+        if contact is not None:    return contact, inside
+        for cell in range(max(ahead, first - 1) + 1, (endHi - 1) // ts + 1):
+            if solidLine(tilemap, axis, cell, otherFirst, otherLast):
+                if inside is None or (cell + 1) * ts < inside:    inside = (cell + 1) * ts
+                break
+    return contact, inside
+
+def sweepEdges(colRects, tilemap, axis, move, startLo, startHi, endLo, endHi, otherLo, otherHi):
+    contact, inside = None, None
+    if colRects:
+        contact, inside = sweepRects(colRects, axis, move, startLo, startHi, endLo, endHi, otherLo, otherHi, contact, inside)
+    if tilemap is not None:
+        contact, inside = sweepTiles(tilemap, axis, move, startLo, startHi, endLo, endHi, otherLo, otherHi, contact, inside)
+    return contact, inside
+
+def sweepAxis(colRects, tilemap, axis, move, startLo, startHi, endLo, endHi, otherLo, otherHi):
+    # Edge to stop at moving along axis or None, see Entity.resolveCollision
+    contact, inside = sweepEdges(colRects, tilemap, axis, move, startLo, startHi, endLo, endHi, otherLo, otherHi)
+    if contact is not None or inside is None:
+        return contact
+
+    # Pushed back out the way it came, up to anything it didn't overlap at the start
+    size = startHi - startLo
+    if move > 0:
+        back, _ = sweepEdges(colRects, tilemap, axis, -move, startLo, startHi, inside - size, inside, otherLo, otherHi)
+        return inside if back is None else back + size
+    back, _ = sweepEdges(colRects, tilemap, axis, -move, startLo, startHi, inside, inside + size, otherLo, otherHi)
+    return inside if back is None else back - size
+
 class Entity:
+    __slots__ = ("pos", "width", "height", "rect", "vel", "collisionDir", "gravity", "applyGravity", "applyVelocity", "applyCollision", "__weakref__")
+
     def __init__(self, *args):
         if len(args) == 4 or len(args) == 1:    x, y, w, h = args
         elif len(args) == 3:    (x, y), w, h = args
@@ -53,46 +145,57 @@ class Entity:
             self.vel.y += self.gravity * delta
             self.vel.y = min(self.vel.y, 200)
         if self.applyCollision:
-            if colRects is None:    colRects = []
-            if tilemap is not None:
-                tilemap.getEntityColRects(self.pos, self.width, self.height, self.vel * delta, colRects)
-
-            self.collisionDir = 0b0000
-
-            self.pos.x += self.vel.x * delta
-            self.updateRectPos()
-            indices = self.rect.collidelistall(colRects)
-
-            for i in indices:
-                if self.vel.x > 0:
-                    self.pos.x = colRects[i].x - self.width
-                    self.vel.x = 0
-                    self.collisionDir |= 0b0100
-                elif self.vel.x < 0:
-                    self.pos.x = colRects[i].right
-                    self.vel.x = 0
-                    self.collisionDir |= 0b0001
-
-            self.pos.y += self.vel.y * delta
-            self.updateRectPos()
-            indices = self.rect.collidelistall(colRects)
-
-            for i in indices:
-                if self.vel.y > 0:
-                    self.pos.y = colRects[i].y - self.height
-                    self.vel.y = 0
-                    self.collisionDir |= 0b0010
-                elif self.vel.y < 0:
-                    self.pos.y = colRects[i].bottom
-                    self.vel.y = 0
-                    self.collisionDir |= 0b1000
-
-            self.updateRectPos()
+            self.collisionDir = self.resolveCollision(delta, tilemap, colRects)
+            self.rect.x = clamp(self.pos.x, self.vel.x)
+            self.rect.y = clamp(self.pos.y, self.vel.y)
             
         elif self.applyVelocity:
             self.pos += self.vel * delta
             self.updateRectPos()
 
+    def resolveCollision(self, delta, tilemap=None, colRects=None):
+        # Swept along x then y. The first time of impact on an axis is the nearest edge, in the direction
+        # of motion, of the rects and solid tiles the move ends up overlapping or passes over completely.
+        # When there is none but the move ends in one it already overlapped, it is pushed out the
+        # shortest way back, stopping at anything it didn't overlap at the start. colRects is only
+        # read, returns the contact normals UP RIGHT DOWN LEFT
+        pos, vel, w, h = self.pos, self.vel, self.width, self.height
+        dx, dy = vel.x * delta, vel.y * delta
+
+        collisionDir = 0b0000
+
+        start = clamp(pos.x, vel.x)
+        pos.x += dx
+        end = clamp(pos.x, vel.x)
+        top = clamp(pos.y, vel.y)
+        if vel.x != 0:
+            contact = sweepAxis(colRects, tilemap, 0, vel.x, start, start + w, end, end + w, top, top + h)
+            if contact is not None:
+                if vel.x > 0:
+                    pos.x = contact - w
+                    collisionDir |= 0b0100
+                else:
+                    pos.x = contact
+                    collisionDir |= 0b0001
+                vel.x = 0
+
+        start = clamp(pos.y, vel.y)
+        pos.y += dy
+        end = clamp(pos.y, vel.y)
+        left = clamp(pos.x, vel.x)
+        if vel.y != 0:
+            contact = sweepAxis(colRects, tilemap, 1, vel.y, start, start + h, end, end + h, left, left + w)
+            if contact is not None:
+                if vel.y > 0:
+                    pos.y = contact - h
+                    collisionDir |= 0b0010
+                else:
+                    pos.y = contact
+                    collisionDir |= 0b1000
+                vel.y = 0
+
+        return collisionDir
+
     def collideEntities(self, entities):
         rect = self.rect
         for e in entities:
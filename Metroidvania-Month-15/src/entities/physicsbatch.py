@@ -0,0 +1,125 @@
+import pygame
+
+import numpy
+
+class PhysicsBatch:
+    # Entity.update with gravity and collision for many entities at once, against the tilemap solid grid
+    def __init__(self, capacity=32):
+        self.resize(capacity)
+
+    def resize(self, capacity):
+        self.capacity = capacity
+        self.pos = numpy.zeros((capacity, 2))
+        self.vel = numpy.zeros((capacity, 2))
+        self.size = numpy.zeros((capacity, 2), dtype=numpy.int64)
+        self.gravity = numpy.zeros(capacity)
+        self.delta = numpy.zeros(capacity)
+        self.collisionDir = numpy.zeros(capacity, dtype=numpy.int64)
+
+    def touchesRects(self, entity, delta, rects):
+        # Generous swept area, entities near rects that aren't tiles go through Entity.update instead
+        vx, vy = entity.vel.x * delta, min(entity.vel.y + entity.gravity * delta, 200) * delta
+        left, top = min(entity.pos.x, entity.pos.x + vx) - 2, min(entity.pos.y, entity.pos.y + vy) - 2
+        area = pygame.Rect(left, top, abs(vx) + entity.width + 4, abs(vy) + entity.height + 4)
+        return area.collidelist(rects) != -1
+
+    def clamp(self, pos, vel):
+        return numpy.where(vel > 0, numpy.ceil(pos), numpy.trunc(pos)).astype(numpy.int64)
+
+    def solidAt(self, tilemap, cellX, cellY):
+        x = cellX - tilemap.gridOrigin[0]
+        y = cellY - tilemap.gridOrigin[1]
+        inside = (x >= 0) & (x < tilemap.gridDim[0]) & (y >= 0) & (y < tilemap.gridDim[1])
+        solid = numpy.zeros(len(x), dtype=numpy.bool_)
+        solid[inside] = tilemap.solidGrid[y[inside], x[inside]]
+        return solid
+
+    def collideAxis(self, tilemap, rectPos, size, axis, start, move):
+        # Solid cell to stop at along axis for each rect, whether it is ahead of start and whether there is one.
+        # Like Entity.resolveCollision the nearest cell ahead of start that the rect overlaps or moved over
+        # completely, otherwise the nearest one it already overlapped at start
+        ts = tilemap.tileSize
+        other = 1 - axis
+        forward = move > 0
+        minCell = rectPos // ts
+        maxCell = (rectPos + size - 1) // ts
+
+        # Cells >= ahead are ahead of start moving forward, cells <= ahead moving back
+        ahead = numpy.where(forward, -(-(start + size[:, axis]) // ts), start // ts - 1)
+        minCell[:, axis] = numpy.where(forward, numpy.minimum(minCell[:, axis], ahead), minCell[:, axis])
+        maxCell[:, axis] = numpy.where(forward, maxCell[:, axis], numpy.maximum(maxCell[:, axis], ahead))
+        span = (maxCell - minCell).max(axis=0) + 1
+
+        contact = numpy.zeros(len(rectPos), dtype=numpy.int64)
+        inside = numpy.zeros(len(rectPos), dtype=numpy.int64)
+        hitAhead = numpy.zeros(len(rectPos), dtype=numpy.bool_)
+        hitInside = numpy.zeros(len(rectPos), dtype=numpy.bool_)
+        for a in range(span[axis]):
+            cellA = minCell[:, axis] + a
+            validA = cellA <= maxCell[:, axis]
+            isAhead = numpy.where(forward, cellA >= ahead, cellA <= ahead)
+            for b in range(span[other]):
+                cellB = minCell[:, other] + b
+                valid = validA & (cellB <= maxCell[:, other])
+                if axis == 0:
+                    solid = valid & self.solidAt(tilemap, cellA, cellB)
+                else:
+                    solid = valid & self.solidAt(tilemap, cellB, cellA)
+                # Cells go up, the nearest is the first one moving forward and the last one moving back
+                contact = numpy.where(solid & isAhead & (~hitAhead | ~forward), cellA, contact)
+                inside = numpy.where(solid & ~isAhead & (~hitInside | forward), cellA, inside)
+                hitAhead |= solid & isAhead
+                hitInside |= solid & ~isAhead
+        return numpy.where(hitAhead, contact, inside), hitAhead, hitAhead | hitInside
+
+    def moveAxis(self, tilemap, pos, vel, size, delta, axis, collisionDir, forwardBit, backBit):
+        ts = tilemap.tileSize
+        start = self.clamp(pos[:, axis], vel[:, axis])
+        pos[:, axis] += vel[:, axis] * delta
+        rectPos = numpy.stack((self.clamp(pos[:, 0], vel[:, 0]), self.clamp(pos[:, 1], vel[:, 1])), axis=1)
+        cell, ahead, hit = self.collideAxis(tilemap, rectPos, size, axis, start, vel[:, axis])
+        forward = hit & (vel[:, axis] > 0)
+        back = hit & (vel[:, axis] < 0)
+        edge = numpy.where(vel[:, axis] > 0, cell * ts - size[:, axis], (cell + 1) * ts)
+
+        # Pushed back out the way it came, up to any cell it didn't overlap at start
+        pushed = (forward | back) & ~ahead
+        if pushed.any():
+            rectPos[:, axis] = edge
+            backCell, backAhead, _ = self.collideAxis(tilemap, rectPos, size, axis, start, -vel[:, axis])
+            edge = numpy.where(pushed & backAhead, numpy.where(vel[:, axis] > 0, (backCell + 1) * ts, backCell * ts - size[:, axis]), edge)
+
+        pos[forward | back, axis] = edge[forward | back]
+        vel[forward | back, axis] = 0
+        collisionDir[forward] |= forwardBit
+        collisionDir[back] |= backBit
+
+    def step(self, entities, deltas, tilemap):
+        n = len(entities)
+        if n == 0:
+            return
+        if n > self.capacity:
+            self.resize(max(n, self.capacity * 2))
+
+        pos, vel, size = self.pos[:n], self.vel[:n], self.size[:n]
+        gravity, delta, collisionDir = self.gravity[:n], self.delta[:n], self.collisionDir[:n]
+        pos.flat = [c for e in entities for c in e.pos]
+        vel.flat = [c for e in entities for c in e.vel]
+        size.flat = [c for e in entities for c in (e.width, e.height)]
+        gravity[:] = [e.gravity for e in entities]
+        delta[:] = deltas
+
+        vel[:, 1] += gravity * delta
+        numpy.minimum(vel[:, 1], 200, out=vel[:, 1])
+        collisionDir[:] = 0
+
+        # Same order as Entity.update, x then y, the rect is the clamped position after each move
+        self.moveAxis(tilemap, pos, vel, size, delta, 0, collisionDir, 0b0100, 0b0001)
+        self.moveAxis(tilemap, pos, vel, size, delta, 1, collisionDir, 0b0010, 0b1000)
+
+        rectPos = numpy.stack((self.clamp(pos[:, 0], vel[:, 0]), self.clamp(pos[:, 1], vel[:, 1])), axis=1)
+        for e, p, v, d, r in zip(entities, pos.tolist(), vel.tolist(), collisionDir.tolist(), rectPos.tolist()):
+            e.pos.update(p)
+            e.vel.update(v)
+            e.collisionDir = d
+            e.rect.topleft = r
@@ -6,8 +6,9 @@ import math
 from src.entities.entity import Entity
 from src.utils.particles import Particles
 from src.utils.animation import Animation
-from src.utils.text import Text
-from src.utils.common import loadSpriteSheet
+from src.utils.text import getFont
+from src.utils.spritecache import SpriteCache
+from src.utils.assetcache import AssetCache
 
 from src.audiosettings import AudioSettings
 
@@ -18,8 +19,7 @@ class Player(Entity):
         if "text" in kwargs:
             self.text = kwargs["text"]
         else:
-            self.text = Text()
-            self.text.loadFontImg("res/imgs/text.png")
+            self.text = getFont("res/imgs/text.png")
         self.textQueue = []
         self.textTimer = 0
         self.currentText = None
@@ -27,12 +27,13 @@ class Player(Entity):
         if "images" in kwargs:
             self.imgs = kwargs["images"]
         else:
-            self.imgs = loadSpriteSheet("res/imgs/player.png", (16,16), (4,3), (1,1), 12, (0,0,0))
+            self.imgs = AssetCache().spriteSheet("res/imgs/player.png", (16,16), (4,3), (1,1), 12, (0,0,0), self)
+        SpriteCache().preload(self.imgs)
         self.idleAnim = Animation((0,4), 6, realTime=True)
         self.runAnim = Animation((4,8), 10, realTime=True)
 
-        self.jumpSound = pygame.mixer.Sound("res/sound/jump.wav")
-        self.kickSound = pygame.mixer.Sound("res/sound/kick.wav")
+        self.jumpSound = AssetCache().sound("res/sound/jump.wav", self)
+        self.kickSound = AssetCache().sound("res/sound/kick.wav", self)
         self.kickSound.set_volume(2)
 
         self.jumpPressTimer = 0
@@ -111,9 +112,9 @@ class Player(Entity):
         if (self.kickTimer > 0 and not self.holdingDown) or self.horizontalKicking or self.kickedEnemyTimer > 0:
             drawIndex = 10
             if self.kickTimer > 0 and not self.holdingDown:  self.kickDir = self.dir
-            win.blit(pygame.transform.flip(self.imgs[drawIndex], self.kickDir == -1, False), self.pos-scroll-(2, 0))
+            win.blit(SpriteCache().get(self.imgs[drawIndex], self.kickDir == -1), self.pos-scroll-(2, 0))
         else:
-            win.blit(pygame.transform.flip(self.imgs[drawIndex], self.dir == -1, False), self.pos-scroll-(2, 0))
+            win.blit(SpriteCache().get(self.imgs[drawIndex], self.dir == -1), self.pos-scroll-(2, 0))
 
         self.waterParticles.draw(win, scroll)
 
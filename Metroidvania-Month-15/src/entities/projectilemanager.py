@@ -0,0 +1,92 @@
+import pygame
+from pygame.math import Vector2
+
+import numpy
+
+class ProjectileManager:
+    # Every projectile in a level, the first count rows are alive
+    def __init__(self, capacity=32, color=(255,255,255)):
+        self.color = color
+
+        self.count = 0
+        self.pos = numpy.zeros((capacity, 2))
+        self.vel = numpy.zeros((capacity, 2))
+        self.r = numpy.zeros(capacity, dtype=numpy.int64)
+
+        self.surfs = {} # Radius: filled square
+
+    def __len__(self):
+        return self.count
+
+    def reserve(self, capacity):
+        if capacity <= len(self.r):    return
+        capacity = max(capacity, len(self.r) * 2)
+
+        for name in ("pos", "vel", "r"):
+            old = getattr(self, name)
+            new = numpy.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def spawn(self, pos, target, r=2, speed=16*6):
+        dirVec = Vector2(target) - pos
+        vel = speed * dirVec.normalize()
+
+        self.reserve(self.count + 1)
+        i = self.count
+        self.pos[i] = (pos[0], pos[1])
+        self.vel[i] = (vel.x, vel.y)
+        self.r[i] = r
+        self.count += 1
+
+    def clear(self):
+        self.count = 0
+
+    def update(self, delta, tilemap):
+        n = self.count
+        if n == 0:    return
+
+        self.pos[:n] += self.vel[:n] * delta
+        self.removeDead(tilemap.collidePoints(self.pos[:n]))
+
+    def removeDead(self, dead):
+        n = self.count
+        dead = numpy.flatnonzero(dead)
+        if len(dead) == 0:    return
+
+        # Fill the holes below the new count with the survivors above it
+        newCount = n - len(dead)
+        holes = dead[dead < newCount]
+        alive = numpy.ones(n - newCount, dtype=numpy.bool_)
+        alive[dead[dead >= newCount] - newCount] = False
+        movers = numpy.flatnonzero(alive) + newCount
+
+        self.pos[holes] = self.pos[movers]
+        self.vel[holes] = self.vel[movers]
+        self.r[holes] = self.r[movers]
+
+        self.count = newCount
+
+    def collideRect(self, rect):
+        n = self.count
+        if n == 0:    return False
+
+        # Truncated like pygame.Rect.collidepoint
+        p = self.pos[:n].astype(numpy.int64)
+        return bool(numpy.any((p[:, 0] >= rect[0]) & (p[:, 0] < rect[0] + rect[2]) & \
+                              (p[:, 1] >= rect[1]) & (p[:, 1] < rect[1] + rect[3])))
+
+    def getSurf(self, r):
+        if r not in self.surfs:
+            surf = pygame.Surface((r + r, r + r)).convert()
+            surf.fill(self.color)
+            self.surfs[r] = surf
+        return self.surfs[r]
+
+    def draw(self, win, scroll):
+        n = self.count
+        if n == 0:    return
+
+        sx, sy = scroll[0], scroll[1]
+        surfs = [self.getSurf(r) for r in self.r[:n].tolist()]
+        win.blits([(surf, (x - r - sx, y - r - sy)) for surf, (x, y), r in zip(surfs, self.pos[:n].tolist(), self.r[:n].tolist())], False)
@@ -8,20 +8,22 @@ from src.screens.screenmanager import ScreenManager, GameScreen
 from src.entities.player import Player
 from src.entities.enemy import GroundEnemy
 from src.entities.enemymanager import EnemyManager
+from src.entities.projectilemanager import ProjectileManager
 
 from src.utils.tilemap import Tilemap
 from src.utils.camera import Camera
-from src.utils.text import Text
+from src.utils.text import getFont
 from src.utils.specialtiles import SpecialTileManager
+from src.utils.background import Starfield
+from src.utils.assetcache import AssetCache
 from src.utils.common import *
 
 class Level(GameScreen):
     def __init__(self, filepath="res/levels/level0.json", **kwargs):
-        self.stars = []
-        for _ in range(random.randrange(400, 800)):
-            self.stars.append((Vector2(random.randrange(-320, 640), random.randrange(-180, 360)), random.randrange(1,3), random.random()*3))
+        # Same density as scattering 400-800 stars over a 960x540 area
+        self.starfield = Starfield(random.randrange(400, 800) / (960 * 540))
         
-        tileImgs = loadSpriteSheet("res/imgs/labtiles.png", (16,16), (5,5), (1,1), 25, (0,0,0))
+        tileImgs = AssetCache().spriteSheet("res/imgs/labtiles.png", (16,16), (5,5), (1,1), 25, (0,0,0), self)
         self.tilemap = Tilemap(16, tileImgs)
         extraData = self.tilemap.loadLevel(filepath)
 
@@ -31,8 +33,7 @@ class Level(GameScreen):
         
         self.transitionTimer = 1
 
-        text = Text()
-        text.loadFontImg("res/imgs/text.png", scale=(2,2))
+        text = getFont("res/imgs/text.png", scale=(2,2))
         
         self.pauseSurf = pygame.Surface((320, 180)).convert()
         self.pauseSurf.set_colorkey((255,0,255))
@@ -41,7 +42,8 @@ class Level(GameScreen):
         pauseText = text.createTextSurf("Paused")
         self.pauseSurf.blit(pauseText, (160 - pauseText.get_width() * 0.5, 90 - pauseText.get_height() * 0.5))
 
-        self.enemyManager = EnemyManager(extraData)
+        self.projectileManager = ProjectileManager()
+        self.enemyManager = EnemyManager(extraData, self.projectileManager)
 
         self.processExtraData(extraData)
 
@@ -71,6 +73,7 @@ class Level(GameScreen):
             self.player.displayText("Your water can freeze enemies", 7)
             self.player.displayText("Have fun!")
 
+        self.projectileManager.clear()
         self.enemyManager.setup()
         self.specialTileManager.setup()
 
@@ -96,9 +99,7 @@ class Level(GameScreen):
 
         self.screenRect = pygame.Rect(self.camera.scroll-Vector2(25,25), (win.get_width()+25, win.get_width()+25))
 
-        scaledTicks = pygame.time.get_ticks() / 350
-        for star in self.stars:
-            pygame.draw.circle(win, (255,255,0), star[0]-self.camera.scroll/20, star[1]+math.sin(scaledTicks+star[2]))
+        self.starfield.draw(win, self.camera.scroll, pygame.time.get_ticks() / 350)
         
         self.tilemap.draw(win, self.camera.scroll)
         #self.tilemap.drawCollision(win, self.camera.scroll)
@@ -109,6 +110,7 @@ class Level(GameScreen):
             pygame.draw.rect(win, (0,255,255), (r.topleft-self.camera.scroll, (r.w, r.h)))
 
         self.enemyManager.draw(win, self.camera.scroll)
+        self.projectileManager.draw(win, self.camera.scroll)
         self.player.draw(win, self.camera.scroll)
 
         if self.paused:
@@ -128,9 +130,12 @@ class Level(GameScreen):
             if self.enemyManager.newScreen is not None:
                 self.screenManager.changeScreen(self.enemyManager.newScreen)
 
+            self.projectileManager.update(delta, self.tilemap)
+            projectileHit = not self.player.invincible and self.projectileManager.collideRect(self.player.rect)
+
             self.specialTileManager.update(delta, self.player)
 
-            if self.enemyManager.reset or self.specialTileManager.reset:
+            if self.enemyManager.reset or self.specialTileManager.reset or projectileHit:
                 self.screenManager.reloadCurrentScreen()
 
             if self.awaitingSpawnTimer > 0:
@@ -5,17 +5,16 @@ import json
 
 from src.screens.screenmanager import ScreenManager, GameScreen
 from src.screens.level import Level
-from src.utils.text import Text
+from src.utils.text import getFont
 
 class TextScreen(GameScreen):
     def __init__(self, filepath="res/levels/texttest.json"):
         with open(filepath, 'r') as f:
             self.data = json.loads(f.read())
         
-        self.text = Text()
-        self.text.loadFontImg("res/imgs/text.png", scale=(1,1))
+        self.text = getFont("res/imgs/text.png", scale=(1,1))
 
-        self.nextDisplay = self.text.createTextSurf("Press any key to continue")
+        self.nextDisplay = self.text.createTextSurf("Press any key to continue").copy()
 
         #self.text.loadFontImg("res/imgs/text.png", scale=(2,2))
         
@@ -1,6 +1,8 @@
 import math
 
 class Animation:
+    __slots__ = ("keyFrames", "value", "index", "dir", "speed", "realTime", "repeat", "active")
+
     def __init__(self, keyFrames, speed=1, repeat="Loop", realTime=False, active=True):
         if len(keyFrames) <= 1:
             print("Not Enough Keyframes.")
@@ -0,0 +1,45 @@
+import pygame
+from pygame.math import Vector2
+
+import math, random
+
+class Starfield:
+    # Stars are spread over tiles that repeat across the screen, each layer holds the stars
+    # sharing one twinkle phase and has its twinkle pre-rendered into a few frames
+    def __init__(self, density, tileDim=(320, 180), layers=3, frames=6, parallax=1/20, color=(255,255,0)):
+        self.tileDim = tileDim
+        self.parallax = parallax
+        self.frameCount = frames
+
+        self.phases = [(l + 0.5) * 3 / layers for l in range(layers)]
+        self.layers = []
+
+        stars = [[] for _ in range(layers)]
+        for _ in range(round(density * tileDim[0] * tileDim[1])):
+            stars[random.randrange(0, layers)].append((Vector2(random.randrange(0, tileDim[0]), random.randrange(0, tileDim[1])), random.randrange(1,3)))
+
+        for layerStars in stars:
+            layerFrames = []
+            for f in range(frames):
+                surf = pygame.Surface(tileDim).convert()
+                surf.fill((0,0,0))
+                surf.set_colorkey((0,0,0))
+                twinkle = math.sin(f / frames * math.tau)
+                for pos, r in layerStars:
+                    # Also draw across the edges so the tile wraps seamlessly
+                    for x in (-tileDim[0], 0, tileDim[0]):
+                        for y in (-tileDim[1], 0, tileDim[1]):
+                            pygame.draw.circle(surf, color, pos + (x, y), r + twinkle)
+                layerFrames.append(surf)
+            self.layers.append(layerFrames)
+
+    def draw(self, win, scroll, time):
+        winDim = win.get_size()
+        startX = -math.floor(scroll.x * self.parallax) % self.tileDim[0] - self.tileDim[0]
+        startY = -math.floor(scroll.y * self.parallax) % self.tileDim[1] - self.tileDim[1]
+
+        for phase, frames in zip(self.phases, self.layers):
+            frame = frames[round(((time + phase) % math.tau) / math.tau * self.frameCount) % self.frameCount]
+            for x in range(startX, winDim[0], self.tileDim[0]):
+                for y in range(startY, winDim[1], self.tileDim[1]):
+                    win.blit(frame, (x, y))
@@ -1,5 +1,13 @@
 import pygame
 
+def singleton(class_):
+    instances = {}
+    def getinstance(*args, **kwargs):
+        if class_ not in instances:
+            instances[class_] = class_(*args, **kwargs)
+        return instances[class_]
+    return getinstance
+
 def loadSpriteSheet(imgPath, spriteSize, dim, padding, count, colorKey=None):
     mainImg = pygame.image.load(imgPath).convert()
 
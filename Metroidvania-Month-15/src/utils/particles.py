@@ -1,75 +1,168 @@
 import pygame
 from pygame.math import Vector2
 
+import numpy
 import random
 
 class Particles:
-    def __init__(self, sizeRange, posRange, circle=False, speed=10, accel=Vector2(0, 0), collision=False, colors=None):
+    def __init__(self, sizeRange, posRange, circle=False, speed=10, accel=Vector2(0, 0), collision=False, colors=None, capacity=64, cellSize=16):
         self.sizeRange, self.posRange = sizeRange, posRange
         self.circle, self.speed, self.accel, self.collision = circle, speed, accel, collision
         if colors is None:    self.colors = [(255,255,255)]
         else:    self.colors = tuple(colors)
 
-        # Data for particles
-        self.pos = []
-        self.siz = [] # Radius
-        self.vel = []
-        self.col = []
+        # Data for particles, only the first count rows are alive
+        self.count = 0
+        self.pos = numpy.zeros((capacity, 2))
+        self.vel = numpy.zeros((capacity, 2))
+        self.siz = numpy.zeros(capacity) # Radius
+        self.col = numpy.zeros(capacity, dtype=numpy.int64)
+
+        # Uniform grid of live particle positions, rebuilt on the first query after they change
+        self.cellSize = cellSize
+        self.cells = {} # Cell pos: [(x, y), ...]
+        self.cellsDirty = False
+
+    def __len__(self):
+        return self.count
+
+    def reserve(self, capacity):
+        if capacity <= len(self.siz):    return
+        capacity = max(capacity, len(self.siz) * 2)
+
+        for name in ("pos", "vel", "siz", "col"):
+            old = getattr(self, name)
+            new = numpy.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
 
     def draw(self, win, scroll=Vector2(0, 0)):
+        n = self.count
+        colors = self.colors
+        sx, sy = scroll[0], scroll[1]
+        particles = zip(self.pos[:n].tolist(), self.siz[:n].tolist(), self.col[:n].tolist())
         if self.circle:
-            for i in range(len(self.pos)):
-                pygame.draw.circle(win, self.colors[self.col[i]], self.pos[i]-scroll, self.siz[i])
+            for (x, y), s, c in particles:
+                pygame.draw.circle(win, colors[c], (x - sx, y - sy), s)
         else:
-            for i in range(len(self.pos)):
-                pygame.draw.rect(win, self.colors[self.col[i]], \
-                    (self.pos[i].x - self.siz[i] - scroll.x, \
-                     self.pos[i].y - self.siz[i] - scroll.y, \
-                     self.siz[i] * 2, self.siz[i] * 2))
+            for (x, y), s, c in particles:
+                pygame.draw.rect(win, colors[c], (x - s - sx, y - s - sy, s * 2, s * 2))
+
+    def pointsInRect(self, points, rect):
+        # Truncated like pygame.Rect.collidepoint
+        p = points.astype(numpy.int64)
+        return (p[:, 0] >= rect[0]) & (p[:, 0] < rect[0] + rect[2]) & \
+               (p[:, 1] >= rect[1]) & (p[:, 1] < rect[1] + rect[3])
 
     def update(self, delta, tilemap=None, colRects=None):
-        if colRects is None:    colRects = []
-        for i in range(len(self.pos))[::-1]:
-            self.vel[i] += self.accel * delta
-
-            if self.collision:
-                self.pos[i].x += self.vel[i].x * delta
-                if tilemap.collidePoint(self.pos[i]) or \
-                    any([rect.collidepoint(self.pos[i]) for rect in colRects]):
-                    self.vel[i].x *= -1
-                    self.pos[i].x += self.vel[i].x * 2 * delta
-                    
-                self.pos[i].y += self.vel[i].y * delta
-                if tilemap.collidePoint(self.pos[i]):
-                    self.vel[i].y *= -random.uniform(0.75, 1)
-                    self.pos[i].y += self.vel[i].y * 2 * delta
-            else:
-                self.pos[i] += self.vel[i] * delta
+        n = self.count
+        if n == 0:    return
+
+        pos, vel, siz = self.pos[:n], self.vel[:n], self.siz[:n]
+
+        vel += (self.accel.x * delta, self.accel.y * delta)
+
+        if self.collision:
+            pos[:, 0] += vel[:, 0] * delta
+            hit = tilemap.collidePoints(pos)
+            if colRects is not None:
+                for rect in colRects:
+                    hit |= self.pointsInRect(pos, rect)
+            vel[hit, 0] *= -1
+            pos[hit, 0] += vel[hit, 0] * 2 * delta
+
+            pos[:, 1] += vel[:, 1] * delta
+            hit = tilemap.collidePoints(pos)
+            vel[hit, 1] *= -numpy.random.uniform(0.75, 1, numpy.count_nonzero(hit))
+            pos[hit, 1] += vel[hit, 1] * 2 * delta
+        else:
+            pos += vel * delta
+
+        siz -= self.speed * delta
+
+        self.removeDead()
+        self.cellsDirty = True
 
-            self.siz[i] -= self.speed * delta
+    def removeDead(self):
+        n = self.count
+        dead = numpy.flatnonzero(self.siz[:n] < 1)
+        if len(dead) == 0:    return
 
-            if self.siz[i] < 1:
-                self.pos.pop(i)
-                self.siz.pop(i)
-                self.vel.pop(i)
-                self.col.pop(i)
+        # Fill the holes below the new count with the survivors above it
+        newCount = n - len(dead)
+        holes = dead[dead < newCount]
+        movers = numpy.flatnonzero(self.siz[newCount:n] >= 1) + newCount
+
+        self.pos[holes] = self.pos[movers]
+        self.vel[holes] = self.vel[movers]
+        self.siz[holes] = self.siz[movers]
+        self.col[holes] = self.col[movers]
+
+        self.count = newCount
 
     def emit(self, pos, amount, velRange):
-        num = amount if amount >= 1 else random.random() > amount
-        for i in range(num):
-            self.pos.append(pos + Vector2(random.uniform(*self.posRange[:2]), random.uniform(*self.posRange[2:])))
-            self.siz.append(random.uniform(*self.sizeRange))
-            self.vel.append(Vector2(random.uniform(*velRange[:2]), random.uniform(*velRange[2:])))
-            self.col.append(random.randrange(0, len(self.colors)))
-    
+        num = amount if amount >= 1 else int(random.random() > amount)
+        if num == 0:    return
+
+        self.reserve(self.count + num)
+
+        if num == 1:
+            # Single particles are by far the most common, skip the array setup
+            i = self.count
+            self.pos[i] = (pos[0] + random.uniform(*self.posRange[:2]), pos[1] + random.uniform(*self.posRange[2:]))
+            self.siz[i] = random.uniform(*self.sizeRange)
+            self.vel[i] = (random.uniform(*velRange[:2]), random.uniform(*velRange[2:]))
+            self.col[i] = random.randrange(0, len(self.colors))
+        else:
+            new = slice(self.count, self.count + num)
+            rand = numpy.random.random((num, 5))
+            self.pos[new, 0] = pos[0] + self.posRange[0] + rand[:, 0] * (self.posRange[1] - self.posRange[0])
+            self.pos[new, 1] = pos[1] + self.posRange[2] + rand[:, 1] * (self.posRange[3] - self.posRange[2])
+            self.siz[new] = self.sizeRange[0] + rand[:, 2] * (self.sizeRange[1] - self.sizeRange[0])
+            self.vel[new, 0] = velRange[0] + rand[:, 3] * (velRange[1] - velRange[0])
+            self.vel[new, 1] = velRange[2] + rand[:, 4] * (velRange[3] - velRange[2])
+            self.col[new] = numpy.random.randint(0, len(self.colors), num)
+
+        self.count += num
+        self.cellsDirty = True
+
     def clear(self):
-        while len(self.pos):
-            self.pos.pop()
-            self.siz.pop()
-            self.vel.pop()
-            self.col.pop()
+        self.count = 0
+        self.cellsDirty = True
+
+    def updateCells(self):
+        if not self.cellsDirty:    return
+        self.cellsDirty = False
+
+        self.cells = {}
+        cs = self.cellSize
+        # Truncated like pygame.Rect.collidepoint
+        for x, y in self.pos[:self.count].astype(numpy.int64).tolist():
+            cell = (x // cs, y // cs)
+            if cell in self.cells:
+                self.cells[cell].append((x, y))
+            else:
+                self.cells[cell] = [(x, y)]
+
+    def _collideRect(self, rect):
+        cs = self.cellSize
+        left, top, right, bottom = rect[0], rect[1], rect[0] + rect[2], rect[1] + rect[3]
+        for cy in range(top // cs, (bottom - 1) // cs + 1):
+            for cx in range(left // cs, (right - 1) // cs + 1):
+                if (cx, cy) not in self.cells:    continue
+                # Every point in a cell the rect fully covers is inside it
+                if left <= cx * cs and (cx + 1) * cs <= right and top <= cy * cs and (cy + 1) * cs <= bottom:
+                    return True
+                for x, y in self.cells[(cx, cy)]:
+                    if left <= x < right and top <= y < bottom:    return True
+        return False
 
     def collideRect(self, rect):
-        for pos in self.pos:
-            if rect.collidepoint(pos):    return True
-        return False
\ No newline at end of file
+        if self.count == 0:    return False
+        self.updateCells()
+        return self._collideRect(rect)
+
+    def collideRects(self, rects):
+        if self.count == 0:    return [False for _ in rects]
+        self.updateCells()
+        return [self._collideRect(rect) for rect in rects]
@@ -1,7 +1,7 @@
 import pygame
 from pygame.math import Vector2
 
-import random, copy
+import random, copy, math
 
 from src.utils.particles import Particles
 
@@ -40,16 +40,63 @@ class SpecialTileManager:
 
         self.reset = not player.invincible and (self.fireManager.reset or self.slimeManager.reset or self.acidManager.reset)
 
+class TileBatch:
+    # Static solid colored tiles baked into one colorkeyed surface per chunk
+    def __init__(self, chunkPixels=128):
+        self.chunkPixels = chunkPixels
+        self.tiles = {} # Chunk pos: {rect tuple: color}
+        self.surfs = {}
+
+    def chunkPos(self, rect):
+        return (rect[0] // self.chunkPixels, rect[1] // self.chunkPixels)
+
+    def add(self, rect, color):
+        pos = self.chunkPos(rect)
+        if pos not in self.tiles:    self.tiles[pos] = {}
+        self.tiles[pos][tuple(rect)] = color
+        self.surfs.pop(pos, None)
+
+    def remove(self, rect):
+        pos = self.chunkPos(rect)
+        if pos in self.tiles and self.tiles[pos].pop(tuple(rect), None) is not None:
+            self.surfs.pop(pos, None)
+
+    def clear(self):
+        self.tiles = {}
+        self.surfs = {}
+
+    def bake(self, pos):
+        originX, originY = pos[0] * self.chunkPixels, pos[1] * self.chunkPixels
+        surf = pygame.Surface((self.chunkPixels, self.chunkPixels)).convert()
+        surf.fill((0,0,0))
+        surf.set_colorkey((0,0,0))
+        for r, color in self.tiles[pos].items():
+            pygame.draw.rect(surf, color, (r[0] - originX, r[1] - originY, r[2], r[3]))
+        return surf
+
+    def draw(self, win, scroll):
+        winDim = win.get_size()
+        cp = self.chunkPixels
+        for pos, tiles in self.tiles.items():
+            if not tiles:    continue
+            x, y = math.floor(pos[0] * cp - scroll.x), math.floor(pos[1] * cp - scroll.y)
+            if x >= winDim[0] or y >= winDim[1] or x <= -cp or y <= -cp:    continue
+            if pos not in self.surfs:    self.surfs[pos] = self.bake(pos)
+            win.blit(self.surfs[pos], (x, y))
+
 class AcidManager:
     def __init__(self, positions, tileSize=16):
         self.rects = [pygame.Rect(pos[0], pos[1], tileSize, tileSize) for pos in positions]
 
+        self.batch = TileBatch()
+        for r in self.rects:
+            self.batch.add(r, (116, 255, 82))
+
     def setup(self):
         self.reset = False
 
     def draw(self, win, scroll):
-        for r in self.rects:
-            pygame.draw.rect(win, (116, 255, 82), (r.topleft-scroll, (r.w, r.h)))
+        self.batch.draw(win, scroll)
 
     def update(self, delta, player):
         if player.rect.collidelist(self.rects) != -1:
@@ -64,11 +111,21 @@ class SlimeManager:
             (224, 66, 245), (192, 43, 255), (240, 140, 255), (155, 99, 230)
         )
 
+        # Colors only depend on the rect, so they are picked once instead of every draw
+        self.origCols = [self.randCol(r) for r in self.origRects]
+        self.batch = TileBatch()
+
         self.setup()
 
     def setup(self):
         self.rects = copy.deepcopy(self.origRects)
+        self.cols = list(self.origCols)
         self.sides = [self.tileSize for _ in self.rects]
+
+        # Full size slimes are baked, shrinking ones are drawn every frame
+        self.batch.clear()
+        for r, col in zip(self.rects, self.cols):
+            self.batch.add(r, col)
         
         self.reset = False
 
@@ -76,22 +133,26 @@ class SlimeManager:
         return hash(r.x) ^ hash(r.y)>>1 ^ hash(r.w)>>2 ^ hash(r.h)>>3
 
     def randCol(self, r):
-        random.seed(self.rectHash(r))
-        i = random.randrange(0,len(self.colors))
-        random.seed()
-        return self.colors[i]
+        # Own generator so the global random state is left alone
+        return self.colors[random.Random(self.rectHash(r)).randrange(0,len(self.colors))]
 
     def draw(self, win, scroll):
+        self.batch.draw(win, scroll)
         for i, r in enumerate(self.rects):
-            pygame.draw.rect(win, self.randCol(r), (r.center-scroll-Vector2(self.sides[i]*0.5, self.sides[i]*0.5), (self.sides[i], self.sides[i])))
+            if self.sides[i] < self.tileSize:
+                pygame.draw.rect(win, self.cols[i], (r.center-scroll-Vector2(self.sides[i]*0.5, self.sides[i]*0.5), (self.sides[i], self.sides[i])))
             
     def update(self, delta, player):
         if player.acid:
+            hits = player.waterParticles.collideRects(self.rects)
             for i in range(len(self.rects))[::-1]:
-                if player.waterParticles.collideRect(self.rects[i]):
+                if hits[i]:
+                    if self.sides[i] == self.tileSize:
+                        self.batch.remove(self.rects[i])
                     self.sides[i] -= 0.5
                     if self.sides[i] <= 2:
                         self.rects.pop(i)
+                        self.cols.pop(i)
                         self.sides.pop(i)
 
 class FireManager:
@@ -113,8 +174,9 @@ class FireManager:
     def update(self, delta, player):
         self.particles.update(delta)
         
+        hits = player.waterParticles.collideRects(self.rects)
         for i, r in enumerate(self.rects):
-            if player.waterParticles.collideRect(r):
+            if hits[i]:
                 self.activeTimers[i] = 2
             elif self.activeTimers[i] <= 0 and player.rect.colliderect(r):
                 self.reset = True
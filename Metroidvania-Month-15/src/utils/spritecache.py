@@ -0,0 +1,55 @@
+import pygame
+
+import weakref
+
+from src.utils.common import singleton
+
+@singleton
+class SpriteCache:
+    def __init__(self):
+        # Image: {(flipX, flipY, size): variant}, entries go away with their image
+        self.variants = weakref.WeakKeyDictionary()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, img, flipX=False, flipY=False, size=None):
+        if size is not None and tuple(size) == img.get_size():    size = None
+        if not flipX and not flipY and size is None:    return img
+
+        key = (flipX, flipY, None if size is None else tuple(size))
+        if img in self.variants:
+            imgVariants = self.variants[img]
+            if key in imgVariants:
+                self.hits += 1
+                return imgVariants[key]
+        else:
+            imgVariants = self.variants[img] = {}
+
+        self.misses += 1
+        variant = img
+        if flipX or flipY:    variant = pygame.transform.flip(variant, flipX, flipY)
+        if size is not None:    variant = pygame.transform.scale(variant, size)
+        imgVariants[key] = variant
+        return variant
+
+    def preload(self, imgs, flips=((False, False), (True, False)), sizes=(None,)):
+        for img in imgs:
+            for flipX, flipY in flips:
+                for size in sizes:
+                    self.get(img, flipX, flipY, size)
+
+    def memoryUse(self):
+        total = 0
+        for imgVariants in self.variants.values():
+            for variant in imgVariants.values():
+                total += variant.get_width() * variant.get_height() * variant.get_bytesize()
+        return total
+
+    def stats(self):
+        return {
+            "hits" : self.hits,
+            "misses" : self.misses,
+            "variants" : sum(len(imgVariants) for imgVariants in self.variants.values()),
+            "bytes" : self.memoryUse()
+        }
@@ -1,29 +1,87 @@
 import pygame
 from pygame.math import Vector2
 
-import json, math
+import numpy
+
+import json, math, operator
+from collections import OrderedDict
+from itertools import repeat
+
+from src.utils.levelformat import hasCompiledLevel, compiledLevelPath, readCompiledLevel
 
 class Tilemap:
-    def __init__(self, tileSize, imgs, chunkSize=8):
+    def __init__(self, tileSize, imgs, chunkSize=8, cacheChunks=True, chunkCacheBytes=2*1024*1024):
         self.tileSize = tileSize
         self.imgs = imgs
         self.drawTiles = []
         self.chunks = {}
         self.chunkSize = chunkSize
 
+        # Every layer of a chunk is baked into one surface the first time it is seen
+        self.cacheChunks = cacheChunks
+        self.chunkCacheBytes = chunkCacheBytes
+        self.tileChunks = {} # Chunk pos: [(x, y, img index), ...] in layer order
+        self.chunkSurfs = OrderedDict()
+        self.chunkSurfBytes = 0
+
+        # One byte per tile, set if any collision rect covers it
+        self.gridOrigin = (0, 0)
+        self.gridDim = (0, 0)
+        self.solidBytes = bytearray()
+        self.solidColumns = bytearray() # Same grid column by column
+        self.solidGrid = numpy.zeros((0, 0), dtype=numpy.bool_)
+
     def toChunkScale(self, p):
         return math.floor(p/self.tileSize/self.chunkSize)
 
     def toChunkPos(self, p):
         return (self.toChunkScale(p[0]), self.toChunkScale(p[1]))
 
+    def buildSolidGrid(self):
+        rects = [rect for rects in self.chunks.values() for rect in rects]
+        if len(rects) == 0:
+            self.gridOrigin, self.gridDim = (0, 0), (0, 0)
+            self.solidBytes = bytearray()
+            self.solidColumns = bytearray()
+            self.solidGrid = numpy.zeros((0, 0), dtype=numpy.bool_)
+            return
+
+        ts = self.tileSize
+        minX = min(rect.x for rect in rects) // ts
+        minY = min(rect.y for rect in rects) // ts
+        maxX = -(-max(rect.right for rect in rects) // ts)
+        maxY = -(-max(rect.bottom for rect in rects) // ts)
+
+        self.gridOrigin = (minX, minY)
+        self.gridDim = (maxX - minX, maxY - minY)
+
+        # The NumPy view shares memory with the bytearray used for single lookups
+        self.solidBytes = bytearray(self.gridDim[0] * self.gridDim[1])
+        self.solidGrid = numpy.frombuffer(self.solidBytes, dtype=numpy.bool_).reshape(self.gridDim[1], self.gridDim[0])
+        for rect in rects:
+            self.solidGrid[rect.y // ts - minY : -(-rect.bottom // ts) - minY, \
+                           rect.x // ts - minX : -(-rect.right // ts) - minX] = True
+        self.solidColumns = bytearray(self.solidGrid.T.tobytes())
+
     def collidePoint(self, p:Vector2):
-        cp = self.toChunkPos(p)
-        if cp in self.chunks:
-            for rect in self.chunks[cp]:
-                if rect.collidepoint(p):    return True
+        # Points are truncated like pygame.Rect.collidepoint does
+        x = int(p[0]) // self.tileSize - self.gridOrigin[0]
+        y = int(p[1]) // self.tileSize - self.gridOrigin[1]
+        if 0 <= x < self.gridDim[0] and 0 <= y < self.gridDim[1]:
+            return self.solidBytes[y * self.gridDim[0] + x] == 1
         return False
 
+    def collidePoints(self, points):
+        points = numpy.asarray(points, dtype=numpy.float64).reshape(-1, 2)
+        cells = points.astype(numpy.int64) // self.tileSize
+        x = cells[:, 0] - self.gridOrigin[0]
+        y = cells[:, 1] - self.gridOrigin[1]
+
+        inside = (x >= 0) & (x < self.gridDim[0]) & (y >= 0) & (y < self.gridDim[1])
+        mask = numpy.zeros(len(points), dtype=numpy.bool_)
+        mask[inside] = self.solidGrid[y[inside], x[inside]]
+        return mask
+
     def _getColRects(self, testPointsX, testPointsY, colRects):
         minX = self.toChunkScale(min(testPointsX))
         maxX = self.toChunkScale(max(testPointsX))
@@ -51,8 +109,72 @@ class Tilemap:
     def getRectColRects(self, rect, colRects=None):
         return self._getColRects((rect.x, rect.right), (rect.y, rect.bottom), colRects)
         
+    def groupTileChunks(self):
+        self.tileChunks = {}
+        for layer in self.drawTiles:
+            for tile in layer:
+                pos = self.toChunkPos(tile)
+                if pos not in self.tileChunks:
+                    self.tileChunks[pos] = []
+                self.tileChunks[pos].append(tile)
+        self.clearChunkSurfs()
+
+    def clearChunkSurfs(self):
+        self.chunkSurfs.clear()
+        self.chunkSurfBytes = 0
+
+    def bakeChunk(self, pos):
+        chunkPixels = self.tileSize * self.chunkSize
+        originX, originY = pos[0] * chunkPixels, pos[1] * chunkPixels
+
+        surf = pygame.Surface((chunkPixels, chunkPixels)).convert()
+        surf.fill((0,0,0))
+        surf.set_colorkey((0,0,0))
+        for tile in self.tileChunks[pos]:
+            surf.blit(self.imgs[tile[2]], (tile[0] - originX, tile[1] - originY))
+        return surf
+
+    def getChunkSurf(self, pos):
+        if pos in self.chunkSurfs:
+            self.chunkSurfs.move_to_end(pos)
+            return self.chunkSurfs[pos]
+
+        surf = self.bakeChunk(pos)
+        self.chunkSurfs[pos] = surf
+        self.chunkSurfBytes += surf.get_width() * surf.get_height() * surf.get_bytesize()
+        return surf
+
+    def evictChunkSurfs(self, visible):
+        # Least recently drawn first, visible chunks were just moved to the end
+        while self.chunkSurfBytes > self.chunkCacheBytes and len(self.chunkSurfs):
+            pos = next(iter(self.chunkSurfs))
+            if pos in visible:    break
+            surf = self.chunkSurfs.pop(pos)
+            self.chunkSurfBytes -= surf.get_width() * surf.get_height() * surf.get_bytesize()
+
+    def drawChunks(self, win, scroll):
+        chunkPixels = self.tileSize * self.chunkSize
+        winDim = win.get_size()
+
+        minX, maxX = self.toChunkScale(scroll.x), self.toChunkScale(scroll.x + winDim[0] - 1)
+        minY, maxY = self.toChunkScale(scroll.y), self.toChunkScale(scroll.y + winDim[1] - 1)
+
+        visible = set()
+        for y in range(minY, maxY + 1):
+            for x in range(minX, maxX + 1):
+                if (x, y) in self.tileChunks:
+                    visible.add((x, y))
+                    # Floored so tiles land on the same pixels as when blitted one by one
+                    win.blit(self.getChunkSurf((x, y)), (math.floor(x * chunkPixels - scroll.x), math.floor(y * chunkPixels - scroll.y)))
+
+        self.evictChunkSurfs(visible)
+
     def draw(self, win, scroll=None):
         if scroll is None:    scroll = Vector2(0, 0)
+        if self.cacheChunks:
+            self.drawChunks(win, scroll)
+            return
+
         winDim = win.get_size()
         for layer in self.drawTiles:
             for tile in layer:
@@ -74,6 +196,9 @@ class Tilemap:
                  rect.w, rect.h), width=1)
 
     def loadLevel(self, filepath):
+        if hasCompiledLevel(filepath):
+            return self.loadCompiledLevel(compiledLevelPath(filepath))
+
         with open(filepath, 'r') as f:
             data = json.loads(f.read())
         for layer in data["drawTiles"]:
@@ -83,6 +208,7 @@ class Tilemap:
                 x, y = int(pStr[0]), int(pStr[1])
                 tempLayer.append((x*self.tileSize, y*self.tileSize, item))
             self.drawTiles.append(tempLayer)
+        self.groupTileChunks()
 
         for pos, rects in data["chunks"].items():
             tempRects = []
@@ -90,6 +216,27 @@ class Tilemap:
                 tempRects.append(pygame.Rect(rect))
             pStr = pos.split(';')
             self.chunks[(int(pStr[0]), int(pStr[1]))] = tempRects
+        self.buildSolidGrid()
             
         if "extraData" in data:
-            return data["extraData"]
\ No newline at end of file
+            return data["extraData"]
+
+    def loadCompiledLevel(self, filepath):
+        data = readCompiledLevel(filepath)
+        if (data["tileSize"], data["chunkSize"]) != (self.tileSize, self.chunkSize):
+            raise ValueError(f"\"{filepath}\" was compiled for tileSize {data['tileSize']} chunkSize {data['chunkSize']}, not {self.tileSize} {self.chunkSize}.")
+
+        tileSize = repeat(self.tileSize)
+        for xs, ys, indices in data["layers"]:
+            self.drawTiles.append(list(zip(map(operator.mul, xs, tileSize), map(operator.mul, ys, tileSize), indices)))
+        self.groupTileChunks()
+
+        r = data["rects"]
+        rects = list(map(pygame.Rect, r[0::4], r[1::4], r[2::4], r[3::4]))
+
+        table = data["chunkTable"]
+        for x, y, start, count in zip(table[0::4], table[1::4], table[2::4], table[3::4]):
+            self.chunks[(x, y)] = rects[start:start+count]
+        self.buildSolidGrid()
+
+        return data["extra"].get("extraData")
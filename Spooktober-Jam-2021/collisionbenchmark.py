@@ -0,0 +1,156 @@
+import pygame
+
+import argparse, random, time
+
+from engine.common import optimizeTilemapCollision
+from engine.tilemap import Tilemap
+
+"""
+
+Benchmark for collision meshing on synthetic maps
+
+python collisionbenchmark.py --sizes 32 64 128 --old-limit 64
+
+Every map is meshed with the old and new optimizeTilemapCollision (old is skipped above
+--old-limit since it gets very slow) and through Tilemap.generateCollision with and
+without mergeChunks. Rect counts are checked to be the same or lower and to cover the same tiles.
+
+"""
+
+# optimizeTilemapCollision before the free tile set, kept here to compare against
+def optimizeTilemapCollisionOld(rects, tileSize):
+    outRects = []
+    usedRects = []
+
+    for rect in rects:
+        if rect in usedRects:
+            continue
+
+        width = tileSize
+        offset = 1
+        goingRight = True
+
+        while goingRight:
+            testRect = pygame.Rect(
+                (rect.x + offset * tileSize, rect.y, tileSize, tileSize))
+
+            if testRect in rects and testRect not in usedRects:
+                width += tileSize
+                offset += 1
+
+                usedRects.append(testRect)
+            else:
+                goingRight = False
+
+        height = tileSize
+        offset = 1
+        goingDown = True
+
+        while goingDown:
+            testRects = [pygame.Rect((rect.x + i * tileSize, rect.y + offset * tileSize, tileSize, tileSize)) for i in range(int(width / tileSize))]
+
+            for tr in testRects:
+                if tr not in rects or tr in usedRects:
+                    goingDown = False
+                    break
+
+            if not goingDown:
+                break
+
+            height += tileSize
+            offset += 1
+
+            for tr in testRects:
+                usedRects.append(tr)
+
+        outRects.append(pygame.Rect(rect.x, rect.y, width, height))
+
+    return outRects
+
+def noiseMap(size, fill, rng):
+    return {(x, y) for y in range(size) for x in range(size) if rng.random() < fill}
+
+def caveMap(size, fill, rng):
+    # A few smoothing passes over noise give big connected blobs like real levels
+    solid = noiseMap(size, fill, rng)
+    for _ in range(4):
+        new = set()
+        for y in range(size):
+            for x in range(size):
+                n = sum((x + dx, y + dy) in solid for dx in (-1, 0, 1) for dy in (-1, 0, 1))
+                if n >= 5:    new.add((x, y))
+        solid = new
+    return solid
+
+def platformMap(size, fill, rng):
+    solid = {(x, y) for x in range(size) for y in (0, size - 1)} | {(x, y) for y in range(size) for x in (0, size - 1)}
+    for _ in range(int(size * size * fill / 8)):
+        x, y, w = rng.randrange(size), rng.randrange(size), rng.randint(2, 12)
+        solid |= {(x + i, y) for i in range(w) if x + i < size}
+    return solid
+
+MAPS = {
+    "noise" : noiseMap,
+    "cave" : caveMap,
+    "platform" : platformMap
+}
+
+TILE_SIZE = 12
+
+def covered(rects):
+    tiles = set()
+    for r in rects:
+        tiles |= {(x, y) for x in range(r[0], r[0] + r[2], TILE_SIZE) for y in range(r[1], r[1] + r[3], TILE_SIZE)}
+    return tiles
+
+def timeIt(func, *args, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        t = time.perf_counter() - start
+        best = t if best is None else min(best, t)
+    return result, best * 1000
+
+def run(kind, size, oldLimit, seed=0):
+    rng = random.Random(seed)
+    solid = MAPS[kind](size, 0.45, rng)
+    rects = [pygame.Rect(x * TILE_SIZE, y * TILE_SIZE, TILE_SIZE, TILE_SIZE) for x, y in solid]
+    rects.sort(key=lambda a:(a.x, a.y))
+    tiles = {r.topleft for r in rects}
+
+    newRects, newTime = timeIt(optimizeTilemapCollision, rects, TILE_SIZE)
+    assert covered(newRects) == tiles
+
+    line = f"{kind:>8} {size:>4}x{size:<4} tiles {len(rects):>6} | new {len(newRects):>6} rects {newTime:9.2f}ms"
+
+    if size <= oldLimit:
+        oldRects, oldTime = timeIt(optimizeTilemapCollisionOld, rects, TILE_SIZE, repeat=1)
+        assert len(newRects) <= len(oldRects)
+        line += f" | old {len(oldRects):>6} rects {oldTime:9.2f}ms"
+    else:
+        line += " | old skipped"
+
+    tilemap = Tilemap(TILE_SIZE)
+    tilemap.drawTiles = [{pos: 1 for pos in solid}]
+    for merge in (False, True):
+        _, t = timeIt(tilemap.generateCollision, {1}, True, True, merge)
+        count = len({tuple(r) for chunk in tilemap.chunks.values() for r in chunk})
+        line += f" | {'merged' if merge else 'chunked'} {count:>6} rects {t:8.2f}ms"
+
+    print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare collision meshing on synthetic maps.")
+    parser.add_argument("--sizes", type=int, nargs='+', default=[32, 64, 128, 256])
+    parser.add_argument("--maps", nargs='+', default=list(MAPS.keys()), choices=list(MAPS.keys()))
+    parser.add_argument("--old-limit", type=int, default=64, help="largest map size to run the old mesher on")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for kind in args.maps:
+        for size in args.sizes:
+            run(kind, size, args.old_limit, args.seed)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+import pygame
+
+import weakref
+from collections import OrderedDict
+
+from engine.common import singleton, loadSpriteSheet
+
+@singleton
+class AssetCache:
+    def __init__(self, budget=32 * 1024 * 1024):
+        # Key: [asset, references, bytes]
+        self.entries = {}
+
+        # Assets nothing references anymore, least recently released first, dropped past budget bytes
+        self.unused = OrderedDict()
+        self.unusedBytes = 0
+        self.budget = budget
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def measure(self, asset):
+        if isinstance(asset, pygame.Surface):
+            return asset.get_width() * asset.get_height() * asset.get_bytesize()
+        if isinstance(asset, list):
+            return sum(self.measure(a) for a in asset)
+        if isinstance(asset, pygame.mixer.Sound) and pygame.mixer.get_init() is not None:
+            freq, size, channels = pygame.mixer.get_init()
+            return int(asset.get_length() * freq * channels * abs(size) // 8)
+        return 0
+
+    def acquire(self, key, load, owner=None):
+        # With an owner the reference is released when the owner is garbage collected, otherwise call release
+        if key in self.entries:
+            self.hits += 1
+            entry = self.entries[key]
+        else:
+            self.misses += 1
+            asset = load()
+            entry = self.entries[key] = [asset, 0, self.measure(asset)]
+
+        if key in self.unused:
+            self.unused.pop(key)
+            self.unusedBytes -= entry[2]
+        entry[1] += 1
+
+        if owner is not None:
+            weakref.finalize(owner, self.release, key).atexit = False
+        return entry[0]
+
+    def cached(self, key):
+        # Doesn't count as a hit or take a reference
+        return key in self.entries
+
+    def release(self, key):
+        entry = self.entries.get(key)
+        if entry is None or entry[1] == 0:
+            return
+
+        entry[1] -= 1
+        if entry[1] == 0:
+            self.unused[key] = None
+            self.unusedBytes += entry[2]
+            self.trim()
+
+    def trim(self):
+        while self.unusedBytes > self.budget and len(self.unused) > 0:
+            key, _ = self.unused.popitem(last=False)
+            self.unusedBytes -= self.entries.pop(key)[2]
+            self.evictions += 1
+
+    def clear(self):
+        # Drops everything, assets still in use stay with whoever has them
+        self.entries = {}
+        self.unused = OrderedDict()
+        self.unusedBytes = 0
+
+    def imageKey(self, path, colorKey=None):
+        return ("image", path, None if colorKey is None else tuple(colorKey))
+
+    def spriteSheetKey(self, path, spriteSize, dim, padding, count, colorKey=None):
+        return ("sheet", path, tuple(spriteSize), tuple(dim), tuple(padding), count, None if colorKey is None else tuple(colorKey))
+
+    def soundKey(self, path):
+        return ("sound", path)
+
+    def loadImage(self, path, colorKey=None):
+        img = pygame.image.load(path).convert()
+        if colorKey is not None:
+            img.set_colorkey(colorKey)
+        return img
+
+    def image(self, path, colorKey=None, owner=None):
+        # Shared between everything that loads it, copy before drawing on it
+        return self.acquire(self.imageKey(path, colorKey), lambda: self.loadImage(path, colorKey), owner)
+
+    def spriteSheet(self, path, spriteSize, dim, padding, count, colorKey=None, owner=None, img=None):
+        # img is the sheet already decoded, only used if it is not cached yet
+        key = self.spriteSheetKey(path, spriteSize, dim, padding, count, colorKey)
+        return list(self.acquire(key, lambda: loadSpriteSheet(path, spriteSize, dim, padding, count, colorKey, img), owner))
+
+    def sound(self, path, owner=None):
+        return self.acquire(self.soundKey(path), lambda: pygame.mixer.Sound(path), owner)
+
+    def stats(self):
+        return {
+            "hits" : self.hits,
+            "misses" : self.misses,
+            "evictions" : self.evictions,
+            "assets" : len(self.entries),
+            "referenced" : sum(1 for entry in self.entries.values() if entry[1] > 0),
+            "bytes" : sum(entry[2] for entry in self.entries.values()),
+            "unusedBytes" : self.unusedBytes
+        }
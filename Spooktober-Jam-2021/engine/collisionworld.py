@@ -0,0 +1,41 @@
+class CollisionWorld:
+    # Tile collision rects for a level, stored flat and indexed by chunk
+    def __init__(self, tileSize, chunkSize=8, chunks=None):
+        self.tileSize = tileSize
+        self.chunkSize = chunkSize
+
+        self.rects = []
+        self.chunkRanges = {} # Chunk pos: (start, end) in rects
+
+        if chunks is not None:
+            self.setChunks(chunks)
+
+    def setChunks(self, chunks):
+        self.rects = []
+        self.chunkRanges = {}
+        for pos, chunk in chunks.items():
+            self.chunkRanges[pos] = (len(self.rects), len(self.rects) + len(chunk))
+            self.rects += chunk
+
+    def toChunkSpace(self, num):
+        return int(num / self.chunkSize / self.tileSize)
+
+    def query(self, rect, move=(0,0), out=None):
+        # Rects in every chunk touched by the rect moving by move, a pixel of room for rounding.
+        # They are appended to out, which is returned, and the caller owns it, nothing is kept here
+        if out is None:
+            out = []
+
+        minX = self.toChunkSpace(min(rect.x, rect.x + move[0]) - 1)
+        maxX = self.toChunkSpace(max(rect.right, rect.right + move[0]) + 1)
+        minY = self.toChunkSpace(min(rect.y, rect.y + move[1]) - 1)
+        maxY = self.toChunkSpace(max(rect.bottom, rect.bottom + move[1]) + 1)
+
+        rects = self.rects
+        for y in range(minY, maxY + 1):
+            for x in range(minX, maxX + 1):
+                if (x, y) in self.chunkRanges:
+                    start, end = self.chunkRanges[(x, y)]
+                    for i in range(start, end):
+                        out.append(rects[i])
+        return out
@@ -1,5 +1,15 @@
 import pygame
 
+import numpy
+
+def singleton(class_):
+    instances = {}
+    def getinstance(*args, **kwargs):
+        if class_ not in instances:
+            instances[class_] = class_(*args, **kwargs)
+        return instances[class_]
+    return getinstance
+
 def lerp(a, b, f):
     return a + f * (b - a)
 
@@ -7,6 +17,17 @@ def lerp(a, b, f):
 def clamp(a, l, u):
     return min(u, max(a, l))
 
+def makeTileGrid(tiles):
+    # Solid grid and origin of a drawTiles layer, None when it is empty
+    positions = numpy.array([p for p in tiles.keys() if p != "offset"], dtype=numpy.int64).reshape(-1, 2)
+    if len(positions) == 0:
+        return None
+    origin = positions.min(axis=0)
+    dim = positions.max(axis=0) - origin + 1
+    grid = numpy.zeros((dim[1], dim[0]), dtype=bool)
+    grid[positions[:, 1] - origin[1], positions[:, 0] - origin[0]] = True
+    return (grid, origin)
+
 def getCollidingRects(testRect, rects):
     hitlist = []
 
@@ -17,56 +38,35 @@ def getCollidingRects(testRect, rects):
     return hitlist
 
 def optimizeTilemapCollision(rects, tileSize):
+    # Greedy merge right then down in sorted order, with a set of free tile positions
+    free = {(r[0], r[1]) for r in rects}
     outRects = []
-    usedRects = []
 
-    for rect in rects:
-        if rect in usedRects:
+    for x, y in sorted(free):
+        if (x, y) not in free:
             continue
+        free.remove((x, y))
 
-        width = tileSize
-        offset = 1
-        goingRight = True
-
-        while goingRight:
-            testRect = pygame.Rect(
-                (rect.x + offset * tileSize, rect.y, tileSize, tileSize))
-
-            if testRect in rects and testRect not in usedRects:
-                width += tileSize
-                offset += 1
-
-                usedRects.append(testRect)
-            else:
-                goingRight = False
-
-        height = tileSize
-        offset = 1
-        goingDown = True
-
-        while goingDown:
-            testRects = [pygame.Rect((rect.x + i * tileSize, rect.y + offset * tileSize, tileSize, tileSize)) for i in range(int(width / tileSize))]
-
-            for tr in testRects:
-                if tr not in rects or tr in usedRects:
-                    goingDown = False
-                    break
+        right = x + tileSize
+        while (right, y) in free:
+            free.remove((right, y))
+            right += tileSize
 
-            if not goingDown:
-                break
+        bottom = y + tileSize
+        while all((tx, bottom) in free for tx in range(x, right, tileSize)):
+            for tx in range(x, right, tileSize):
+                free.remove((tx, bottom))
+            bottom += tileSize
 
-            height += tileSize
-            offset += 1
-
-            for tr in testRects:
-                usedRects.append(tr)
-
-        outRects.append(pygame.Rect(rect.x, rect.y, width, height))
+        outRects.append(pygame.Rect(x, y, right - x, bottom - y))
 
     return outRects
 
-def loadSpriteSheet(imgPath, spriteSize, dim, padding, count, colorKey=None):
-    mainImg = pygame.image.load(imgPath).convert()
+def loadSpriteSheet(imgPath, spriteSize, dim, padding, count, colorKey=None, img=None):
+    # img is the sheet already loaded but not converted, like from a worker thread
+    if img is None:
+        img = pygame.image.load(imgPath)
+    mainImg = img.convert()
 
     if colorKey is not None:
         mainImg.set_colorkey(colorKey, pygame.RLEACCEL)
@@ -8,6 +8,10 @@ class GameScreen:
     def load(self, screenManager):
         self.screenManager = screenManager
 
+    def restore(self):
+        # Return True if the screen put itself back to how it was after setup
+        return False
+
     def draw(self, win):
         pass
 
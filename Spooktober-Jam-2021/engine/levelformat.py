@@ -0,0 +1,125 @@
+import json, mmap, os, struct, sys
+from array import array
+
+"""
+
+Compiled level format (little endian)
+
+Header - magic, version, tileSize, chunkSize, layer count, chunk count, rect count, extra size
+Layer table - tile count per layer
+Layers - for each layer: int32 x[n], int32 y[n], int32 tile index[n] (tile coordinates)
+Chunk table - for each chunk: int32 x, y, first rect, rect count
+Rects - int32 x, y, w, h
+Extra - utf-8 JSON of every other top level key in the source file
+
+"""
+
+MAGIC = b"LVLB"
+VERSION = 1
+HEADER = struct.Struct("<4sIiiIIII")
+COMPILED_EXT = ".lvl"
+
+def compiledLevelPath(filepath):
+    return os.path.splitext(filepath)[0] + COMPILED_EXT
+
+def hasCompiledLevel(filepath):
+    compiledPath = compiledLevelPath(filepath)
+    if not os.path.exists(compiledPath):    return False
+    if not os.path.exists(filepath):    return True
+    return os.path.getmtime(compiledPath) >= os.path.getmtime(filepath)
+
+def _toBytes(values):
+    arr = array('i', values)
+    if sys.byteorder != "little":    arr.byteswap()
+    return arr.tobytes()
+
+def _readInts(buf, offset, count):
+    size = count * 4
+    if sys.byteorder != "little":
+        arr = array('i')
+        arr.frombytes(buf[offset:offset+size])
+        arr.byteswap()
+        return arr.tolist(), offset + size
+    with buf[offset:offset+size] as view, view.cast('i') as ints:
+        return ints.tolist(), offset + size
+
+def writeCompiledLevel(path, layers, chunks, extra, tileSize=0, chunkSize=0):
+    # layers: [[(x, y, index), ...], ...] chunks: {(x, y): [(x, y, w, h), ...]}
+    chunkTable, rects = [], []
+    for pos, chunkRects in chunks.items():
+        chunkTable += [pos[0], pos[1], len(rects) // 4, len(chunkRects)]
+        for rect in chunkRects:
+            rects += rect[:4]
+
+    extraBytes = json.dumps(extra, separators=(',', ':')).encode("utf-8")
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, tileSize, chunkSize, len(layers), len(chunks), len(rects) // 4, len(extraBytes)))
+        f.write(_toBytes([len(layer) for layer in layers]))
+        for layer in layers:
+            f.write(_toBytes([tile[0] for tile in layer]))
+            f.write(_toBytes([tile[1] for tile in layer]))
+            f.write(_toBytes([tile[2] for tile in layer]))
+        f.write(_toBytes(chunkTable))
+        f.write(_toBytes(rects))
+        f.write(extraBytes)
+
+def readCompiledLevel(path):
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as buf:
+        magic, version, tileSize, chunkSize, layerCount, chunkCount, rectCount, extraSize = HEADER.unpack_from(buf)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"\"{path}\" is not a compiled level (version {VERSION}).")
+
+        offset = HEADER.size
+        tileCounts, offset = _readInts(buf, offset, layerCount)
+
+        layers = []
+        for count in tileCounts:
+            xs, offset = _readInts(buf, offset, count)
+            ys, offset = _readInts(buf, offset, count)
+            indices, offset = _readInts(buf, offset, count)
+            layers.append((xs, ys, indices))
+
+        chunkTable, offset = _readInts(buf, offset, chunkCount * 4)
+        rects, offset = _readInts(buf, offset, rectCount * 4)
+
+        extra = json.loads(str(buf[offset:offset+extraSize], "utf-8"))
+
+    return {
+        "tileSize" : tileSize,
+        "chunkSize" : chunkSize,
+        "layers" : layers,
+        "chunkTable" : chunkTable,
+        "rects" : rects,
+        "extra" : extra
+    }
+
+def _splitKey(key):
+    pStr = key.split(';')
+    return (int(pStr[0]), int(pStr[1]))
+
+def convertLevel(filepath, outPath=None):
+    with open(filepath, 'r') as f:
+        data = json.loads(f.read())
+    if "tileSize" not in data or "drawTiles" not in data or "chunks" not in data:
+        raise ValueError(f"\"{filepath}\" is not a level (no tileSize, drawTiles or chunks).")
+
+    tileSize = data.pop("tileSize")
+    layers = [[(*_splitKey(key), item) for key, item in layer.items()] for layer in data.pop("drawTiles")]
+
+    chunks = data.pop("chunks")
+    chunks.pop("tileSize")
+    chunkSize = chunks.pop("chunkSize")
+    chunks = {_splitKey(key): rects for key, rects in chunks.items()}
+
+    if outPath is None:    outPath = compiledLevelPath(filepath)
+    writeCompiledLevel(outPath, layers, chunks, data, tileSize, chunkSize)
+    return outPath
+
+if __name__ == '__main__':
+    # python -m engine.levelformat data/maps/*.json
+    for filepath in sys.argv[1:]:
+        try:
+            print(f"{filepath} -> {convertLevel(filepath)}")
+        except ValueError as e:
+            print(f"{filepath} skipped: {e}")
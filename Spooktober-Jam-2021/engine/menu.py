@@ -2,7 +2,7 @@ import pygame
 
 from engine.common import *
 from engine.animation import Animation
-from engine.text import Text
+from engine.text import getFont
 
 class Menu:
     def __init__(self, texts, fontScale, spacing, offset, functions, arguments=None, color=(255,255,255)):
@@ -16,8 +16,7 @@ class Menu:
 
         self.color = color
 
-        self.imgText = Text()
-        self.imgText.loadFontImg("data/images/text.png", scale=(fontScale, fontScale), color=self.color)
+        self.imgText = getFont("data/images/text.png", scale=(fontScale, fontScale), color=self.color)
         self.fontScale = fontScale
 
         self.lineAnim = Animation([0, 1], repeat="Stop", realTime=True)
@@ -1,9 +1,12 @@
 import pygame
 
+import numpy
 import random
 
+from engine.common import makeTileGrid
+
 class Particles:
-    def __init__(self, sizeRange, startPosRange, startVelRange=[0, .1, 0, .1], maxParticles=250, circle=False, speed=0.1, gravity=0, colors=None, startCol=(255,255,255), endCol=(0,0,0)):
+    def __init__(self, sizeRange, startPosRange, startVelRange=[0, .1, 0, .1], maxParticles=250, circle=False, speed=0.1, gravity=0, colors=None, startCol=(255,255,255), endCol=(0,0,0), colorSteps=64):
         self.sizeRange = list(sizeRange)
         self.startPosRange = list(startPosRange)
         self.startVelRange = list(startVelRange)
@@ -16,78 +19,125 @@ class Particles:
         self.startCol = pygame.Color(startCol)
         self.endCol = pygame.Color(endCol)
 
-        self.pos = []
-        self.size = []
-        self.vel = []
-        self.emptyQueue = []
-
-        for i in range(maxParticles):
-            self.pos.append([0,0])
-            self.size.append(0)
-            self.vel.append([0,0])
-            self.emptyQueue.append(i)
-        
-        self.activeParticles = []
-    
+        # endCol -> startCol ramp indexed by size / max size, instead of a lerp per particle every draw
+        self.colorLut = [tuple(self.endCol.lerp(self.startCol, i / (colorSteps - 1))) for i in range(colorSteps)]
+
+        self.pos = numpy.zeros((maxParticles, 2))
+        self.size = numpy.zeros(maxParticles)
+        self.vel = numpy.zeros((maxParticles, 2))
+        self.alive = numpy.zeros(maxParticles, dtype=bool)
+
+        # Stack of free slots, the top is freeList[freeCount - 1]
+        self.freeList = numpy.arange(maxParticles)
+        self.freeCount = maxParticles
+
+    def __len__(self):
+        return len(self.size) - self.freeCount
+
+    def collideTiles(self, pos, tileGrid, tileSize):
+        if tileGrid is None:
+            return numpy.zeros(len(pos), dtype=bool)
+        grid, origin = tileGrid
+
+        # Truncated like int(pos / tileSize)
+        x = (pos[:, 0] / tileSize).astype(numpy.int64) - origin[0]
+        y = (pos[:, 1] / tileSize).astype(numpy.int64) - origin[1]
+        inside = (x >= 0) & (x < grid.shape[1]) & (y >= 0) & (y < grid.shape[0])
+
+        hit = numpy.zeros(len(pos), dtype=bool)
+        hit[inside] = grid[y[inside], x[inside]]
+        return hit
+
     def draw(self, win, scroll=(0,0)):
-        for i in self.activeParticles:
-            col = (0, 0, 0)
-            if self.colors == ():
-                col = self.endCol.lerp(self.startCol, self.size[i] / self.sizeRange[1])
-            else:
-                col = random.choice(self.colors)#self.colors[i % len(self.colors)]
+        live = numpy.flatnonzero(self.alive)
+        if len(live) == 0:
+            return
+
+        size = self.size[live]
+        if self.colors == ():
+            lut = numpy.clip(size / self.sizeRange[1] * (len(self.colorLut) - 1) + 0.5, 0, len(self.colorLut) - 1).astype(numpy.int64)
+            cols = [self.colorLut[i] for i in lut.tolist()]
+        else:
+            # New color every frame so fire and wind flicker
+            cols = [self.colors[i] for i in numpy.random.randint(0, len(self.colors), len(live)).tolist()]
+
+        if self.circle:
+            x = (self.pos[live, 0] - scroll[0]).astype(numpy.int64).tolist()
+            y = (self.pos[live, 1] - scroll[1]).astype(numpy.int64).tolist()
+            r = (size / 2).astype(numpy.int64).tolist()
+            for col, px, py, pr in zip(cols, x, y, r):
+                pygame.draw.circle(win, col, (px, py), pr)
+        else:
+            x = (self.pos[live, 0] - size / 2 - scroll[0]).astype(numpy.int64).tolist()
+            y = (self.pos[live, 1] - size / 2 - scroll[1]).astype(numpy.int64).tolist()
+            s = size.astype(numpy.int64).tolist()
+            for col, px, py, ps in zip(cols, x, y, s):
+                pygame.draw.rect(win, col, (px, py, ps, ps))
 
-            if self.circle:
-                pygame.draw.circle(win, col, (int(self.pos[i][0] - scroll[0]), int(self.pos[i][1] - scroll[1])), int(self.size[i] / 2))
-            else:
-                pygame.draw.rect(win, col, (int(self.pos[i][0] - self.size[i] / 2 - scroll[0]), int(self.pos[i][1] - self.size[i] / 2 - scroll[1]), int(self.size[i]), int(self.size[i])))
-    
     def update(self, delta, tiles=None, colLayer=0, tileSize=8):
-        if tiles is None:
-            tiles = {}
-        #print(self.activeParticles)
-        for i in self.activeParticles[::-1]:
-            self.vel[i][1] += self.gravity * delta
-
-            self.size[i] -= self.speed * delta
-
-            if tiles != {}:
-                self.pos[i][0] += self.vel[i][0] * delta
-
-                tilePos = (int(self.pos[i][0] / tileSize), int(self.pos[i][1] / tileSize))
-                if tilePos in tiles[colLayer]:
-                    self.vel[i][0] *= -1
-                    self.pos[i][0] += self.vel[i][0] * 2 * delta
-                
-                self.pos[i][1] += self.vel[i][1] * delta
-
-                tilePos = (int(self.pos[i][0] / tileSize), int(self.pos[i][1] / tileSize))
-                if tilePos in tiles[colLayer]:
-                    self.vel[i][1] *= -random.uniform(0.75, 1)
-                    self.pos[i][1] += self.vel[i][1] * 2 * delta
+        live = numpy.flatnonzero(self.alive)
+        if len(live) == 0:
+            return
+
+        pos, vel = self.pos[live], self.vel[live]
+
+        vel[:, 1] += self.gravity * delta
+        self.size[live] -= self.speed * delta
+
+        if tiles:
+            # A Tilemap keeps the grid until its tiles change, a drawTiles list is read again every call
+            if isinstance(tiles, list):
+                tileGrid = makeTileGrid(tiles[colLayer])
             else:
-                self.pos[i][0] += self.vel[i][0] * delta
-                self.pos[i][1] += self.vel[i][1] * delta
-            
-            if self.size[i] < 1:
-                self.activeParticles.remove(i)
-                self.emptyQueue.append(i)
-    
+                tileGrid, tileSize = tiles.getTileGrid(colLayer), tiles.tileSize
+
+            pos[:, 0] += vel[:, 0] * delta
+            hit = self.collideTiles(pos, tileGrid, tileSize)
+            vel[hit, 0] *= -1
+            pos[hit, 0] += vel[hit, 0] * 2 * delta
+
+            pos[:, 1] += vel[:, 1] * delta
+            hit = self.collideTiles(pos, tileGrid, tileSize)
+            vel[hit, 1] *= -numpy.random.uniform(0.75, 1, numpy.count_nonzero(hit))
+            pos[hit, 1] += vel[hit, 1] * 2 * delta
+        else:
+            pos += vel * delta
+
+        self.pos[live], self.vel[live] = pos, vel
+
+        dead = live[self.size[live] < 1]
+        if len(dead) > 0:
+            self.alive[dead] = False
+            self.freeList[self.freeCount:self.freeCount + len(dead)] = dead
+            self.freeCount += len(dead)
+
     def emit(self, pos, amount, newVelRange=None):
         if newVelRange is None:
             newVelRange = []
         if amount < 1:
-            amount = random.random() < amount
-        for i in range(amount):
-            if len(self.emptyQueue) > 0:
-                self.pos[self.emptyQueue[-1]] = [pos[0] + random.uniform(self.startPosRange[0], self.startPosRange[1]), pos[1] + random.uniform(self.startPosRange[2], self.startPosRange[3])]
+            amount = int(random.random() < amount)
+        amount = min(amount, self.freeCount)
+        if amount == 0:
+            return
 
-                velRange = self.startVelRange
-                if newVelRange != []:
-                    velRange = newVelRange
-                self.vel[self.emptyQueue[-1]] = [random.uniform(velRange[0], velRange[1]), random.uniform(velRange[2], velRange[3])]
+        velRange = self.startVelRange
+        if newVelRange != []:
+            velRange = newVelRange
 
-                self.size[self.emptyQueue[-1]] = random.uniform(self.sizeRange[0], self.sizeRange[1])
+        if amount == 1:
+            # Most emits are single particles, skip the array setup
+            i = self.freeList[self.freeCount - 1]
+            self.pos[i] = (pos[0] + random.uniform(self.startPosRange[0], self.startPosRange[1]), pos[1] + random.uniform(self.startPosRange[2], self.startPosRange[3]))
+            self.vel[i] = (random.uniform(velRange[0], velRange[1]), random.uniform(velRange[2], velRange[3]))
+            self.size[i] = random.uniform(self.sizeRange[0], self.sizeRange[1])
+        else:
+            i = self.freeList[self.freeCount - amount:self.freeCount]
+            rand = numpy.random.random((amount, 5))
+            self.pos[i, 0] = pos[0] + self.startPosRange[0] + rand[:, 0] * (self.startPosRange[1] - self.startPosRange[0])
+            self.pos[i, 1] = pos[1] + self.startPosRange[2] + rand[:, 1] * (self.startPosRange[3] - self.startPosRange[2])
+            self.vel[i, 0] = velRange[0] + rand[:, 2] * (velRange[1] - velRange[0])
+            self.vel[i, 1] = velRange[2] + rand[:, 3] * (velRange[3] - velRange[2])
+            self.size[i] = self.sizeRange[0] + rand[:, 4] * (self.sizeRange[1] - self.sizeRange[0])
 
-                self.activeParticles.append(self.emptyQueue[-1])
-                self.emptyQueue.pop()
\ No newline at end of file
+        self.alive[i] = True
+        self.freeCount -= amount
@@ -0,0 +1,25 @@
+import threading
+
+class Prefetch:
+    # Runs func(*args) on a worker thread, result waits for it to finish and raises whatever it raised
+    def __init__(self, func, *args):
+        self.value = None
+        self.error = None
+
+        self.thread = threading.Thread(target=self.run, args=(func, args), daemon=True)
+        self.thread.start()
+
+    def run(self, func, args):
+        try:
+            self.value = func(*args)
+        except Exception as e:
+            self.error = e
+
+    def done(self):
+        return not self.thread.is_alive()
+
+    def result(self):
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.value
@@ -5,6 +5,7 @@ import copy
 from engine.gamescreen import GameScreen
 from engine.input import Input
 from engine.animation import Animation
+from engine.assetcache import AssetCache
 
 from game.audiosettings import AudioSettings
 
@@ -15,8 +16,7 @@ class ScreenManager:
         self.currentScreen.setup()
         self.inp = Input()
 
-        self.triangleWipe = pygame.image.load("data/images/other/Triangle Wipe.png").convert()
-        self.triangleWipe.set_colorkey((0,0,0))
+        self.triangleWipe = AssetCache().image("data/images/other/Triangle Wipe.png", (0,0,0), self)
         
         self.screenWipeAnim = Animation([-320, 0, -320], 960, "Stop Restart", True, False)
         self.prevScreenWipeKeyframe = 0
@@ -70,6 +70,8 @@ class ScreenManager:
         self.screenWipeAnim.start()
     
     def reloadCurrentScreen(self):
+        if self.currentScreen.restore():
+            return
         self.currentScreen.load(self)
         self.currentScreen.setup()
     
@@ -0,0 +1,70 @@
+import pygame
+
+import numpy
+
+from engine.entity import Entity
+from engine.animation import Animation
+from engine.particles import Particles
+from engine.menu import Menu
+
+# Objects of these types have their own state captured, anything else that is not a plain
+# value or container (surfaces, sounds, fonts, tilemaps) is shared with the snapshot as is
+SNAPSHOT_TYPES = (Entity, Animation, Particles, Menu)
+
+class ObjectState:
+    def __init__(self, obj, state):
+        self.obj = obj
+        self.state = state
+
+def getStateNames(obj):
+    names = list(getattr(obj, '__dict__', {}).keys())
+    for cls in type(obj).__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            if name not in names and name != '__dict__' and name != '__weakref__' and hasattr(obj, name):
+                names.append(name)
+    return names
+
+def copyValue(value):
+    if isinstance(value, (pygame.Rect, pygame.math.Vector2, pygame.Color)):
+        return type(value)(value)
+    if isinstance(value, numpy.ndarray):
+        return value.copy()
+    if isinstance(value, list):
+        return [copyValue(v) for v in value]
+    if isinstance(value, tuple):
+        return tuple(copyValue(v) for v in value)
+    if isinstance(value, dict):
+        return {key: copyValue(v) for key, v in value.items()}
+    if isinstance(value, set):
+        return set(value)
+    if isinstance(value, SNAPSHOT_TYPES):
+        return ObjectState(value, captureState(value))
+    return value
+
+def captureState(obj, exclude=()):
+    return {name: copyValue(getattr(obj, name)) for name in getStateNames(obj) if name not in exclude}
+
+def restoreValue(current, saved):
+    # Rects, vectors and arrays are written into the current object when they can be, other code may hold them
+    if isinstance(saved, ObjectState):
+        restoreState(saved.obj, saved.state)
+        return saved.obj
+    if isinstance(saved, (pygame.Rect, pygame.math.Vector2)) and type(current) is type(saved):
+        current.update(saved)
+        return current
+    if isinstance(saved, numpy.ndarray):
+        if isinstance(current, numpy.ndarray) and current.shape == saved.shape:
+            current[...] = saved
+            return current
+        return saved.copy()
+    if isinstance(saved, list):
+        return [restoreValue(None, v) for v in saved]
+    if isinstance(saved, tuple):
+        return tuple(restoreValue(None, v) for v in saved)
+    if isinstance(saved, dict):
+        return {key: restoreValue(None, v) for key, v in saved.items()}
+    return copyValue(saved)
+
+def restoreState(obj, state):
+    for name, saved in state.items():
+        setattr(obj, name, restoreValue(getattr(obj, name, None), saved))
@@ -0,0 +1,89 @@
+import pygame
+
+import math
+
+class SpatialHash:
+    # Buckets entity rects by grid cell, entries only move between buckets when they change cells
+    def __init__(self, cellSize=24):
+        self.cellSize = cellSize
+        self.cells = {} # Cell pos: {rect id: rect}
+        self.entries = {} # Rect id: [rect, cell range, insert order]
+        self.insertCount = 0
+
+    def __contains__(self, rect):
+        return id(rect) in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def getCellRange(self, rect):
+        return (rect.left // self.cellSize, rect.top // self.cellSize, (rect.right - 1) // self.cellSize, (rect.bottom - 1) // self.cellSize)
+
+    def addToCells(self, rect, cellRange):
+        for y in range(cellRange[1], cellRange[3] + 1):
+            for x in range(cellRange[0], cellRange[2] + 1):
+                if (x, y) not in self.cells:
+                    self.cells[(x, y)] = {}
+                self.cells[(x, y)][id(rect)] = rect
+
+    def removeFromCells(self, rect, cellRange):
+        for y in range(cellRange[1], cellRange[3] + 1):
+            for x in range(cellRange[0], cellRange[2] + 1):
+                cell = self.cells[(x, y)]
+                cell.pop(id(rect))
+                if len(cell) == 0:
+                    self.cells.pop((x, y))
+
+    def insert(self, rect):
+        # The rect is kept by reference, call update after moving it
+        cellRange = self.getCellRange(rect)
+        self.entries[id(rect)] = [rect, cellRange, self.insertCount]
+        self.insertCount += 1
+        self.addToCells(rect, cellRange)
+
+    def remove(self, rect):
+        entry = self.entries.pop(id(rect), None)
+        if entry is not None:
+            self.removeFromCells(rect, entry[1])
+
+    def update(self, rect):
+        entry = self.entries.get(id(rect))
+        if entry is None:
+            return
+
+        cellRange = self.getCellRange(rect)
+        if cellRange != entry[1]:
+            self.removeFromCells(rect, entry[1])
+            self.addToCells(rect, cellRange)
+            entry[1] = cellRange
+
+    def clear(self):
+        self.cells = {}
+        self.entries = {}
+
+    def query(self, rect, exclude=None, out=None):
+        # Candidates in the cells the rect covers, in insert order so results do not depend on the hash.
+        # They are appended to out when it is given, like CollisionWorld.query
+        cellRange = self.getCellRange(rect)
+        found = {}
+        for y in range(cellRange[1], cellRange[3] + 1):
+            for x in range(cellRange[0], cellRange[2] + 1):
+                if (x, y) in self.cells:
+                    found.update(self.cells[(x, y)])
+
+        if exclude is not None:
+            found.pop(id(exclude), None)
+
+        if out is None:
+            out = []
+        for key in sorted(found, key=lambda key: self.entries[key][2]):
+            out.append(self.entries[key][0])
+        return out
+
+    def queryMove(self, rect, pos, move, out=None):
+        # Area covered by a rect at pos moving by move, with a pixel of room for rounding
+        left = math.floor(min(pos[0], pos[0] + move[0])) - 1
+        top = math.floor(min(pos[1], pos[1] + move[1])) - 1
+        right = math.ceil(max(pos[0], pos[0] + move[0]) + rect.w) + 1
+        bottom = math.ceil(max(pos[1], pos[1] + move[1]) + rect.h) + 1
+        return self.query(pygame.Rect(left, top, right - left, bottom - top), rect, out)
@@ -1,19 +1,47 @@
 import pygame
 
+from collections import OrderedDict
+
 from engine.common import *
+from engine.assetcache import AssetCache
+
+# Fonts shared by getFont, one per (image path, glyph layout, color, scale)
+fonts = {}
+
+def getFont(imgPath, maxDim=(5,8), charWidths=None, padding=1, color=(255,255,255), colorKey=(0,0,0), scale=(1,1)):
+    key = (imgPath, tuple(maxDim), None if charWidths is None else tuple(charWidths.items()), padding, tuple(color), tuple(colorKey), tuple(scale))
+    if key not in fonts:
+        text = Text()
+        text.loadFontImg(imgPath, maxDim, charWidths, padding, color, colorKey, scale)
+        text.shared = True
+        fonts[key] = text
+    return fonts[key]
 
 class Text():
-    def __init__(self):
+    def __init__(self, maxCacheEntries=64, maxCacheBytes=256 * 1024):
+        # Set on fonts from getFont, they are used all over so they can't be reloaded
+        self.shared = False
+
         self.fontImg = None
         self.chars = {} #Char: [width, img]
         self.maxCharDim = []
         self.scale = 1
 
+        # Rendered strings, least recently used first
+        self.cache = OrderedDict()
+        self.cacheBytes = 0
+        self.maxCacheEntries = maxCacheEntries
+        self.maxCacheBytes = maxCacheBytes
+        self.hits = 0
+        self.misses = 0
+
         self.defaultWidths = {'A':3, 'B':3, 'C':3, 'D':3, 'E':3, 'F':3, 'G':3, 'H':3, 'I':3, 'J':3, 'K':3, 'L':3, 'M':5, 'N':3, 'O':3, 'P':3, 'Q':3, 'R':3, 'S':3, 'T':3, 'U':3, 'V':3, 'W':5, 'X':3, 'Y':3, 'Z':3, 'a':3, 'b':3, 'c':3, 'd':3, 'e':3, 'f':3, 'g':3, 'h':3, 'i':2, 'j':3, 'k':3, 'l':2, 'm':5, 'n':3, 'o':3, 'p':3, 'q':3, 'r':3, 's':3, 't':3, 'u':3, 'v':3, 'w':5, 'x':3, 'y':3, 'z':3, '.':2, '-':3, ',':3, ':':2, '+':4, "'":2, '!':2, '?':3, '0':3, '1':3, '2':3, '3':3, '4':3, '5':3, '6':3, '7':3, '8':3, '9':3, '(':2, ')':2, '/':3, '_':5, '=':3, '\\':3, '[':2, ']':2, '*':3, '"':3, '<':3, '>':3, ';':2}
     
     def loadFontImg(self, imgPath, maxDim=(5,8), charWidths=None, padding=1, color=(255,255,255), colorKey=(0,0,0), scale=(1,1)):
-        self.fontImg = pygame.image.load(imgPath).convert()
-        self.fontImg.set_colorkey(colorKey)
+        if self.shared:
+            raise RuntimeError("Can't reload a shared font, use getFont for the new one instead.")
+
+        self.fontImg = AssetCache().image(imgPath, colorKey, self)
         
         if color != (255,255,255):
             self.fontImg = swapImgColor(self.fontImg, (255, 255, 255), color)
@@ -23,21 +51,56 @@ class Text():
         self.scale = scale
 
         self.chars = {}
+        self.clearCache()
 
         if charWidths is None:
             charWidths = self.defaultWidths
 
+        # Scaled once as a whole, the glyphs are subsurfaces of it
+        self.fontImg = pygame.transform.scale(self.fontImg, (self.fontImg.get_width() * self.scale[0], self.fontImg.get_height() * self.scale[1])).convert()
+
         for i, d in enumerate(charWidths.items()):
             key, item = d
             
-            charRect = (i * (maxDim[0] + padding), 0, item, maxDim[1])
+            charRect = (i * (maxDim[0] + padding) * self.scale[0], 0, item * self.scale[0], maxDim[1] * self.scale[1])
 
-            self.chars[key] = (item, pygame.transform.scale(self.fontImg.subsurface(charRect).convert(), (self.scale[0] * charRect[2], self.scale[1] * charRect[3])))
+            self.chars[key] = (item, self.fontImg.subsurface(charRect))
     
     def measureText(self, msg):
         return (sum(((self.chars[c][0] + 1) * self.scale[0] if c != ' ' and c != '\n' else self.maxCharDim[0] * self.scale[0] for c in msg)), self.maxCharDim[1] * self.scale[1] + sum((self.maxCharDim[1] * self.scale[1] for c in msg if c == '\n')))
     
+    def clearCache(self):
+        self.cache = OrderedDict()
+        self.cacheBytes = 0
+
+    def cacheStats(self):
+        return {
+            "hits" : self.hits,
+            "misses" : self.misses,
+            "hitRate" : self.hits / max(self.hits + self.misses, 1),
+            "entries" : len(self.cache),
+            "bytes" : self.cacheBytes
+        }
+
     def createTextSurf(self, msg):
+        # The surface is shared with later calls for the same string, copy it before changing it
+        if msg in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(msg)
+            return self.cache[msg]
+        self.misses += 1
+
+        surf = self.renderTextSurf(msg)
+        size = surf.get_width() * surf.get_height() * surf.get_bytesize()
+        if size <= self.maxCacheBytes:
+            self.cache[msg] = surf
+            self.cacheBytes += size
+            while len(self.cache) > self.maxCacheEntries or self.cacheBytes > self.maxCacheBytes:
+                _, old = self.cache.popitem(last=False)
+                self.cacheBytes -= old.get_width() * old.get_height() * old.get_bytesize()
+        return surf
+
+    def renderTextSurf(self, msg):
         surf = pygame.Surface(self.measureText(msg)).convert()
         surf.set_colorkey((0,0,0))
 
@@ -1,7 +1,78 @@
 import pygame
-import json, random
+import json, math, random
 
 from engine.common import *
+from engine.levelformat import hasCompiledLevel, compiledLevelPath, readCompiledLevel
+from engine.collisionworld import CollisionWorld
+from engine.assetcache import AssetCache
+
+def readJsonLevel(path):
+    with open(path) as f:
+        data = f.read()
+    
+    jsonData = json.loads(data)
+
+    tileSize = jsonData['tileSize']
+    jsonData.pop('tileSize')
+    
+    drawTiles = []
+    for i in range(len(jsonData['drawTiles'])):
+        drawTiles.append({})
+        for key in jsonData['drawTiles'][i].keys():
+            splitKey = key.split(';')
+            drawTiles[i][(int(splitKey[0]), int(splitKey[1]))] = jsonData['drawTiles'][i][key]
+    jsonData.pop('drawTiles')
+
+    chunkSize = jsonData['chunks']['chunkSize']
+    chunks = {}
+    for key in jsonData['chunks'].keys():
+        if key != 'tileSize' and key != 'chunkSize':
+            chunk = []
+            for tile in jsonData['chunks'][key]:
+                chunk.append(pygame.Rect(tile[0], tile[1], tile[2], tile[3]))
+        
+            key = key.split(';')
+            chunks[(int(key[0]), int(key[1]))] = chunk
+    jsonData.pop('chunks')
+
+    return {'tileSize' : tileSize, 'chunkSize' : chunkSize, 'drawTiles' : drawTiles, 'chunks' : chunks, 'extra' : jsonData}
+
+def readCompiledLevelData(path):
+    data = readCompiledLevel(path)
+
+    drawTiles = [dict(zip(zip(xs, ys), indices)) for xs, ys, indices in data['layers']]
+
+    r = data['rects']
+    rects = list(map(pygame.Rect, r[0::4], r[1::4], r[2::4], r[3::4]))
+
+    chunks = {}
+    table = data['chunkTable']
+    for x, y, start, count in zip(table[0::4], table[1::4], table[2::4], table[3::4]):
+        chunks[(x, y)] = rects[start:start+count]
+
+    return {'tileSize' : data['tileSize'], 'chunkSize' : data['chunkSize'], 'drawTiles' : drawTiles, 'chunks' : chunks, 'extra' : data['extra']}
+
+def readLevel(path, loadTileImgs=False, compiled=False):
+    # Everything Tilemap.loadFromData needs without touching the display, so it can run on a worker thread
+    if compiled:
+        data = readCompiledLevelData(path)
+    elif hasCompiledLevel(path):
+        data = readCompiledLevelData(compiledLevelPath(path))
+    else:
+        data = readJsonLevel(path)
+
+    data['collisionWorld'] = CollisionWorld(data['tileSize'], data['chunkSize'], data['chunks'])
+
+    # Decoded only, converting needs the display mode and happens in loadTileImgs. Skipped when the
+    # AssetCache already has the sheet sliced
+    data['tileSheet'] = None
+    if loadTileImgs:
+        imgData = data['extra']['imgData']
+        key = AssetCache().spriteSheetKey(imgData['path'], (data['tileSize'], data['tileSize']), imgData['tilesDim'], imgData['padding'], imgData['count'], imgData['colorKey'])
+        if not AssetCache().cached(key):
+            data['tileSheet'] = pygame.image.load(imgData['path'])
+
+    return data
 
 class Tilemap:
     def __init__(self, tileSize, chunkSize=8, layers=1):
@@ -11,16 +82,24 @@ class Tilemap:
         
         self.chunkSize = chunkSize
         self.tileSize = tileSize
+        self.collisionWorld = CollisionWorld(tileSize, chunkSize)
         self.tileImgs = []
 
         self.imgData = {}
+
+        # Per layer {chunk pos: {tile pos: index}} and the baked surfaces for them
+        self.layerChunks = []
+        self.chunkSurfs = {} # (layer, chunk pos): (surf, x, y)
+        self.fadedSurfs = {} # (layer, chunk pos): (alpha, copy of the chunk surf with it) for highlightLayer
+        self.tileGrids = {} # Layer: makeTileGrid of it, for Particles
     
     def addDrawTile(self, tilePos, tileIndex, override=False, layer=0):
         #posStr = str(int(tilePos[0])) + ';' + str(int(tilePos[1]))
         if tilePos is not tuple:
             tilePos = (int(tilePos[0]), int(tilePos[1]))
-        if tilePos not in self.drawTiles[layer] or override:
+        if tilePos not in self.drawTiles[layer] or (override and self.drawTiles[layer][tilePos] != tileIndex):
             self.drawTiles[layer][tilePos] = tileIndex
+            self.invalidate(layer, tilePos)
     
     def removeDrawTile(self, tilePos, layer=0):
         #posStr = str(int(tilePos[0])) + ';' + str(int(tilePos[1]))
@@ -28,13 +107,101 @@ class Tilemap:
             tilePos = (int(tilePos[0]), int(tilePos[1]))
         if tilePos in self.drawTiles[layer]:
             self.drawTiles[layer].pop(tilePos)
+            self.invalidate(layer, tilePos)
+
+    def invalidate(self, layer=None, tilePos=None):
+        # Call after changing drawTiles directly (like floodFill), edits through the methods above do it already
+        if layer is None:
+            self.layerChunks = []
+            self.chunkSurfs = {}
+            self.fadedSurfs = {}
+            self.tileGrids = {}
+            return
+        self.tileGrids.pop(layer, None)
+        if tilePos is None or layer >= len(self.layerChunks):
+            if layer < len(self.layerChunks):    self.layerChunks[layer] = None
+            self.chunkSurfs = {key: item for key, item in self.chunkSurfs.items() if key[0] != layer}
+            self.fadedSurfs = {key: item for key, item in self.fadedSurfs.items() if key[0] != layer}
+        else:
+            chunkPos = (tilePos[0] // self.chunkSize, tilePos[1] // self.chunkSize)
+            if self.layerChunks[layer] is not None:
+                chunk = self.layerChunks[layer].setdefault(chunkPos, {})
+                if tilePos in self.drawTiles[layer]:
+                    chunk[tilePos] = self.drawTiles[layer][tilePos]
+                else:
+                    chunk.pop(tilePos, None)
+            self.chunkSurfs.pop((layer, chunkPos), None)
+            self.fadedSurfs.pop((layer, chunkPos), None)
+
+    def getTileGrid(self, layer):
+        if layer not in self.tileGrids:
+            self.tileGrids[layer] = makeTileGrid(self.drawTiles[layer])
+        return self.tileGrids[layer]
+
+    def getLayerChunks(self, layer):
+        while len(self.layerChunks) < len(self.drawTiles):
+            self.layerChunks.append(None)
+
+        if self.layerChunks[layer] is None:
+            chunks = {}
+            for key, i in self.drawTiles[layer].items():
+                if key != "offset":
+                    chunks.setdefault((key[0] // self.chunkSize, key[1] // self.chunkSize), {})[key] = i
+            self.layerChunks[layer] = chunks
+        return self.layerChunks[layer]
+
+    def bakeChunk(self, layer, chunkPos):
+        offset = self.drawTiles[layer].get("offset", (0, 0))
+        tiles = [((pos[0] * self.tileSize + offset[0], pos[1] * self.tileSize + offset[1]), self.tileImgs[i]) for pos, i in self.layerChunks[layer][chunkPos].items()]
+        if len(tiles) == 0:
+            return None
+
+        # Sized to what is drawn so offset or oversized images are not cut off at the chunk edge
+        bounds = pygame.Rect(tiles[0][0], tiles[0][1].get_size()).unionall([pygame.Rect(pos, img.get_size()) for pos, img in tiles])
+
+        surf = pygame.Surface(bounds.size).convert_alpha()
+        surf.set_colorkey((0,0,0))
+        for pos, img in tiles:
+            surf.blit(img, (pos[0] - bounds.x, pos[1] - bounds.y))
+        return (surf, bounds.x, bounds.y)
+
+    def getLayerAlpha(self, layer, highlightLayer):
+        if highlightLayer is None or layer == highlightLayer:
+            return None
+        return round(255 - ((abs(layer - highlightLayer) % len(self.drawTiles) / (len(self.drawTiles) - 1)) * 128 + 64))
     
-    def generateCollision(self, collidableTiles, optimize, resetCollision=True):
+    def getChunkPos(self, pos):
+        return (int(pos[0] / self.chunkSize / self.tileSize), int(pos[1] / self.chunkSize / self.tileSize))
+
+    def generateCollision(self, collidableTiles, optimize, resetCollision=True, mergeChunks=False):
         if resetCollision:
             self.chunks = {}
         collidableTiles = set(collidableTiles)
-        self.chunks['tileSize'] = self.tileSize
-        self.chunks['chunkSize'] = self.chunkSize
+
+        if mergeChunks:
+            # Merge over the whole map, rects crossing a chunk border are added to every chunk they touch
+            tiles = []
+            for l in range(len(self.drawTiles)):
+                offset = self.drawTiles[l].get("offset", (0, 0))
+                for key, i in self.drawTiles[l].items():
+                    if key != "offset" and i in collidableTiles:
+                        tiles.append((key[0] * self.tileSize + offset[0], key[1] * self.tileSize + offset[1]))
+
+            if optimize:
+                rects = optimizeTilemapCollision(tiles, self.tileSize)
+            else:
+                rects = [pygame.Rect(pos[0], pos[1], self.tileSize, self.tileSize) for pos in tiles]
+
+            for rect in rects:
+                minChunk, maxChunk = self.getChunkPos(rect.topleft), self.getChunkPos((rect.right - 1, rect.bottom - 1))
+                for y in range(minChunk[1], maxChunk[1] + 1):
+                    for x in range(minChunk[0], maxChunk[0] + 1):
+                        if (x, y) not in self.chunks:
+                            self.chunks[(x, y)] = []
+                        self.chunks[(x, y)].append(rect)
+            self.buildCollisionWorld()
+            return
+
         for l in range(len(self.drawTiles)):
             offset = [0, 0]
             for key, i in self.drawTiles[l].items():
@@ -46,7 +213,7 @@ class Tilemap:
                         #pos = (int(pStr[0]) * self.tileSize + offset[0], int(pStr[1]) * self.tileSize + offset[1])
                         pos = (key[0] * self.tileSize + offset[0], key[1]* self.tileSize + offset[1])
 
-                        chunkPos = (int(pos[0] / self.chunkSize / self.tileSize), int(pos[1] / self.chunkSize / self.tileSize))
+                        chunkPos = self.getChunkPos(pos)
 
                         if chunkPos not in self.chunks:
                             self.chunks[chunkPos] = []
@@ -57,9 +224,12 @@ class Tilemap:
 
         if optimize:
             for pos, chunk in self.chunks.items():
-                if pos != 'tileSize' and pos != 'chunkSize':
-                    chunk.sort(key=lambda a:(a.x, a.y))
-                    self.chunks[pos] = optimizeTilemapCollision(chunk, self.tileSize)
+                self.chunks[pos] = optimizeTilemapCollision(chunk, self.tileSize)
+
+        self.buildCollisionWorld()
+
+    def buildCollisionWorld(self):
+        self.collisionWorld = CollisionWorld(self.tileSize, self.chunkSize, self.chunks)
     
     def addDecoration(self, applyTiles, decorationImgs, applyLayer=0, decorationLayer=1, spread=0.1):
         self.tileImgs += decorationImgs
@@ -74,7 +244,9 @@ class Tilemap:
                 if random.random() < spread:
                     self.drawTiles[decorationLayer][pos] = len(self.tileImgs) - random.randint(0, len(decorationImgs)) - 1
 
-    def loadTileImgs(self, imgPath, imgTilesDim, imgPadding, tilesCount, colorKey=None):
+        self.invalidate(decorationLayer)
+
+    def loadTileImgs(self, imgPath, imgTilesDim, imgPadding, tilesCount, colorKey=None, img=None):
         if self.imgData == {}:
             self.imgData = {
                 'path' : imgPath,
@@ -83,58 +255,46 @@ class Tilemap:
                 'count' : tilesCount,
                 'colorKey' : colorKey
             }
-        self.tileImgs = loadSpriteSheet(imgPath, (self.tileSize, self.tileSize), imgTilesDim, imgPadding, tilesCount, colorKey)
+        self.tileImgs = AssetCache().spriteSheet(imgPath, (self.tileSize, self.tileSize), imgTilesDim, imgPadding, tilesCount, colorKey, self, img)
+        self.invalidate()
     
     def loadFromJson(self, path, loadTileImgs=False):
-        with open(path) as f:
-            data = f.read()
-        
-        jsonData = json.loads(data)
+        return self.loadFromData(readLevel(path, loadTileImgs), loadTileImgs)
+
+    def loadFromCompiled(self, path, loadTileImgs=False):
+        return self.loadFromData(readLevel(path, loadTileImgs, True), loadTileImgs)
+
+    def loadFromData(self, data, loadTileImgs=False):
+        # data from readLevel, which can run on another thread
+        jsonData = data['extra']
 
         if loadTileImgs:
-            self.loadTileImgs(jsonData['imgData']['path'], jsonData['imgData']['tilesDim'], jsonData['imgData']['padding'], jsonData['imgData']['count'], jsonData['imgData']['colorKey'])
+            self.loadTileImgs(jsonData['imgData']['path'], jsonData['imgData']['tilesDim'], jsonData['imgData']['padding'], jsonData['imgData']['count'], jsonData['imgData']['colorKey'], data['tileSheet'])
 
             jsonData.pop('imgData')
-        
-        self.tileSize = jsonData['tileSize']
-        jsonData.pop('tileSize')
-        
-        self.drawTiles = []
-        for i in range(len(jsonData['drawTiles'])):
-            self.drawTiles.append({})
-            for key in jsonData['drawTiles'][i].keys():
-                splitKey = key.split(';')
-                self.drawTiles[i][(int(splitKey[0]), int(splitKey[1]))] = jsonData['drawTiles'][i][key]
-        jsonData.pop('drawTiles')
-
-        self.chunks = {
-            'tileSize' : jsonData['chunks']['tileSize'],
-            'chunkSize' : jsonData['chunks']['chunkSize']
-        }
-        for key in jsonData['chunks'].keys():
-            if key != 'tileSize' and key != 'chunkSize':
-                chunk = []
-                for tile in jsonData['chunks'][key]:
-                    chunk.append(pygame.Rect(tile[0], tile[1], tile[2], tile[3]))
-            
-                key = key.split(';')
-                self.chunks[(int(key[0]), int(key[1]))] = chunk
-        jsonData.pop('chunks')
+
+        self.tileSize = data['tileSize']
+
+        self.drawTiles = data['drawTiles']
+        self.invalidate()
+
+        self.chunkSize = data['chunkSize']
+        self.chunks = data['chunks']
+        self.collisionWorld = data['collisionWorld']
 
         return jsonData
 
     def saveToJson(self, path=None, writeFile=True):
         newChunks = {
-            'tileSize' : self.chunks['tileSize'],
-            'chunkSize' : self.chunks['chunkSize']
+            'tileSize' : self.tileSize,
+            'chunkSize' : self.chunkSize
         }
         
         for key in self.chunks.keys():
-            if key != 'tileSize' and key != 'chunkSize':
-                chunk = []
-                for rect in self.chunks[key]:
-                    chunk.append([rect.x, rect.y, rect.w, rect.h])
-                newChunks[f"{int(key[0])};{int(key[1])}"] = chunk
+            chunk = []
+            for rect in self.chunks[key]:
+                chunk.append([rect.x, rect.y, rect.w, rect.h])
+            newChunks[f"{int(key[0])};{int(key[1])}"] = chunk
         
         jsonData = {
             'imgData' : self.imgData,
@@ -155,37 +315,49 @@ class Tilemap:
         return jsonData
     
     def draw(self, win, scroll=(0,0), highlightLayer=None):
+        chunkPixels = self.tileSize * self.chunkSize
+        winDim = win.get_size()
+        view = pygame.Rect(math.floor(scroll[0]), math.floor(scroll[1]), winDim[0] + 1, winDim[1] + 1)
+
+        # One chunk of margin for decorations hanging over the edge of their chunk
+        minX, maxX = view.left // chunkPixels - 1, view.right // chunkPixels + 1
+        minY, maxY = view.top // chunkPixels - 1, view.bottom // chunkPixels + 1
+
         for l in range(len(self.drawTiles)):
-            layerSurf = pygame.Surface((win.get_width(), win.get_height())).convert_alpha()
-            layerSurf.set_colorkey((0,0,0))
-            offset = [0, 0]
-            for key, i in self.drawTiles[l].items():
-                if key == "offset":
-                    offset = i
-                else:
-                    #pStr = pStr.split(';')
-                    pos = key#(int(pStr[0]) * self.tileSize + offset[0], int(pStr[1]) * self.tileSize + offset[1])
-
-                    if pos[0] * self.tileSize - scroll[0] > -self.tileSize and pos[0] * self.tileSize - scroll[0] < win.get_width() and pos[1] * self.tileSize - scroll[1] > -self.tileSize and pos[1] * self.tileSize - scroll[1] < win.get_height():
-                        layerSurf.blit(self.tileImgs[i], (pos[0] * self.tileSize + offset[0] - scroll[0], pos[1] * self.tileSize + offset[1] - scroll[1]))
-            if highlightLayer != None and l != highlightLayer:
-                layerSurf.set_alpha(255 - ((abs(l - highlightLayer) % len(self.drawTiles) / (len(self.drawTiles) - 1)) * 128 + 64))
-            win.blit(layerSurf, (0,0))
-    
+            chunks = self.getLayerChunks(l)
+            alpha = self.getLayerAlpha(l, highlightLayer)
+            for y in range(minY, maxY + 1):
+                for x in range(minX, maxX + 1):
+                    if (x, y) not in chunks:    continue
+
+                    if (l, (x, y)) not in self.chunkSurfs:
+                        self.chunkSurfs[(l, (x, y))] = self.bakeChunk(l, (x, y))
+                    baked = self.chunkSurfs[(l, (x, y))]
+                    if baked is None:    continue
+
+                    surf, sx, sy = baked
+                    if alpha is not None:
+                        # The baked surf is left as it is for draws without highlightLayer
+                        faded = self.fadedSurfs.get((l, (x, y)))
+                        if faded is None or faded[0] != alpha:
+                            faded = self.fadedSurfs[(l, (x, y))] = (alpha, surf.copy())
+                            faded[1].set_alpha(alpha)
+                        surf = faded[1]
+                    # Floored so tiles land on the same pixels as when blitted one by one
+                    win.blit(surf, (math.floor(sx - scroll[0]), math.floor(sy - scroll[1])))
+
     def collisionDraw(self, win, drawChunks=False):
         colors = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0), (0, 255, 255), (255, 0, 255)]
 
         i = 0
         for pos, chunk in self.chunks.items():
-            if pos != 'tileSize' and pos != 'chunkSize':
-                for tile in chunk:
-                    pygame.draw.rect(win, colors[i % len(colors)], tile, width=1)
-                    i += 1
+            for tile in chunk:
+                pygame.draw.rect(win, colors[i % len(colors)], tile, width=1)
+                i += 1
         
         if drawChunks:
             for key in self.chunks.keys():
-                if key != 'tileSize' and key != 'chunkSize':
-                    #pStr = pStr.split(';')
-                    pos = key#(int(pStr[0]) * self.tileSize * self.chunkSize, int(pStr[1]) * self.tileSize * self.chunkSize)
+                #pStr = pStr.split(';')
+                pos = key#(int(pStr[0]) * self.tileSize * self.chunkSize, int(pStr[1]) * self.tileSize * self.chunkSize)
 
-                    pygame.draw.rect(win, (0,0,0), (pos[0] * self.tileSize * self.chunkSize, pos[1] * self.tileSize * self.chunkSize, self.chunkSize * self.tileSize, self.chunkSize * self.tileSize), width=1)
\ No newline at end of file
+                pygame.draw.rect(win, (0,0,0), (pos[0] * self.tileSize * self.chunkSize, pos[1] * self.tileSize * self.chunkSize, self.chunkSize * self.tileSize, self.chunkSize * self.tileSize), width=1)
\ No newline at end of file
@@ -0,0 +1,49 @@
+import pygame
+
+from engine.spatialhash import SpatialHash
+
+def mergeTouchingRects(rects):
+    # Rows of rects with the same height that touch side to side, then columns of rows with the same width
+    # Returns [(merged rect, [source rects]), ...]
+    rows = []
+    for r in sorted(rects, key=lambda r:(r.y, r.h, r.x)):
+        if rows and rows[-1][0].y == r.y and rows[-1][0].h == r.h and r.x <= rows[-1][0].right:
+            rows[-1][0].w = max(rows[-1][0].right, r.right) - rows[-1][0].x
+            rows[-1][1].append(r)
+        else:
+            rows.append((pygame.Rect(r), [r]))
+
+    merged = []
+    for r, tiles in sorted(rows, key=lambda row:(row[0].x, row[0].w, row[0].y)):
+        if merged and merged[-1][0].x == r.x and merged[-1][0].w == r.w and r.y <= merged[-1][0].bottom:
+            merged[-1][0].h = max(merged[-1][0].bottom, r.bottom) - merged[-1][0].y
+            merged[-1][1].extend(tiles)
+        else:
+            merged.append((r, tiles))
+    return merged
+
+class TriggerRegion:
+    def __init__(self, kind, rect, tiles):
+        self.kind = kind
+        self.rect = rect
+        self.tiles = tiles # The rects that were merged into this region
+
+class Triggers:
+    def __init__(self, cellSize=48):
+        self.hash = SpatialHash(cellSize)
+        self.regions = {} # Rect id: region
+
+    def add(self, kind, rects):
+        for rect, tiles in mergeTouchingRects(rects):
+            self.regions[id(rect)] = TriggerRegion(kind, rect, tiles)
+            self.hash.insert(rect)
+
+    def query(self, rect, kind=None):
+        # Regions touching the rect
+        return [self.regions[id(r)] for r in self.hash.query(rect) if r.colliderect(rect) and (kind is None or self.regions[id(r)].kind == kind)]
+
+    def collides(self, rect, kind):
+        for r in self.hash.query(rect):
+            if r.colliderect(rect) and self.regions[id(r)].kind == kind:
+                return True
+        return False
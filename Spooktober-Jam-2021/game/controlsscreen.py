@@ -1,13 +1,12 @@
 import pygame
 
 from engine.gamescreen import GameScreen
-from engine.text import Text
+from engine.text import getFont
 from engine.menu import Menu
 
 class ControlsScreen(GameScreen):
     def setup(self):
-        self.text = Text()
-        self.text.loadFontImg("data/images/text.png", scale=(2,2), color=(255, 229, 127))
+        self.text = getFont("data/images/text.png", scale=(2,2), color=(255, 229, 127))
 
         self.textSurf = self.text.createTextSurf("Left, Right -> move\nc / Up -> jump\nx -> discard pumpkin\nr -> restart\nESC -> pause\nF11/CTRL+f -> toggle fullscreen\nm -> mute music\ns -> mute sfx").copy()
         
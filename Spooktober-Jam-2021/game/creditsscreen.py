@@ -3,7 +3,6 @@ import pygame
 import webbrowser
 
 from engine.gamescreen import GameScreen
-from engine.text import Text
 from engine.menu import Menu
 
 class CreditsScreen(GameScreen):
@@ -3,13 +3,13 @@ import pygame
 import copy
 
 from engine.entity import Entity
+from engine.assetcache import AssetCache
 
 class Ghost(Entity):
     def __init__(self, x, y, width, height, yAccel):
         super().__init__(x, y, width, height, (200,200,200))
 
-        self.img = pygame.image.load("data/images/characters/ghost.png").convert()
-        self.img.set_colorkey((0,0,0))
+        self.img = AssetCache().image("data/images/characters/ghost.png", (0,0,0), self)
 
         self.applyVelocity = True
 
@@ -3,10 +3,15 @@ import pygame
 import random
 
 from engine.gamescreen import GameScreen
-from engine.tilemap import Tilemap
-from engine.text import Text
+from engine.tilemap import Tilemap, readLevel
+from engine.text import getFont
 from engine.menu import Menu
 from engine.particles import Particles
+from engine.spatialhash import SpatialHash
+from engine.triggers import Triggers
+from engine.snapshot import captureState, restoreState
+from engine.prefetch import Prefetch
+from engine.assetcache import AssetCache
 from engine.common import *
 
 from game.player import Player
@@ -19,7 +24,11 @@ class Level(GameScreen):
         super().setup()
 
         self.tilemap = Tilemap(12)
-        extraMapData = self.tilemap.loadFromJson(f"data/maps/level{self.levelNum}.json", True)
+        if self.mapData is not None:
+            extraMapData = self.tilemap.loadFromData(self.mapData.result(), True)
+            self.mapData = None
+        else:
+            extraMapData = self.tilemap.loadFromJson(f"data/maps/level{self.levelNum}.json", True)
         #level{self.levelNum}.json
 
         playerSpawn = [20,100]
@@ -29,28 +38,30 @@ class Level(GameScreen):
         self.player = Player(playerSpawn[0], playerSpawn[1], 12, 12)
         self.ghost = Ghost(0, 0, 12, 12, self.player.gravity)
 
-        self.levelExitImg = pygame.image.load("data/images/tiles/candles.png").convert()
-        self.levelExitImg.set_colorkey((0,0,0))
+        self.levelExitImg = AssetCache().image("data/images/tiles/candles.png", (0,0,0), self)
         self.levelExitParticles = Particles([2,4], [-4, 4, -1, 1], [-15, 15, -35, -40], 100, True, 4, colors=((250, 192, 0), (255, 117, 0), (255,255,0), (255,128,0)))
         if 'levelExit' in extraMapData:
             self.levelExit = pygame.Rect((extraMapData['levelExit'][0][0], extraMapData['levelExit'][0][1], 12, 12))
         else:
             self.levelExit = pygame.Rect((0,0,0,0))
         
-        self.spikeImg = pygame.image.load("data/images/tiles/spikes.png").convert()
-        self.spikeImg.set_colorkey((0,0,0))
+        self.spikeImg = AssetCache().image("data/images/tiles/spikes.png", (0,0,0), self)
         self.spikes = []
         if 'spikes' in extraMapData:
             for pos in extraMapData['spikes']:
                 self.spikes.append(pygame.Rect((pos[0], pos[1] + 8, 12, 4)))
 
-        self.jackOLanternImg = pygame.image.load("data/images/characters/jack_o_lantern.png").convert()
-        self.jackOLanternImg.set_colorkey((0,0,0))
-        self.pumpkinImgs = loadSpriteSheet("data/images/characters/Pumpkin.png", (14,14), (4,2), (1,1), 8, (0,0,0))
+        self.jackOLanternImg = AssetCache().image("data/images/characters/jack_o_lantern.png", (0,0,0), self)
+        self.pumpkinImgs = AssetCache().spriteSheet("data/images/characters/Pumpkin.png", (14,14), (4,2), (1,1), 8, (0,0,0), self)
         self.pumpkinImgs = [self.pumpkinImgs[0], self.pumpkinImgs[4], self.pumpkinImgs[5]]
         self.pumpkins = []
+        self.awakePumpkins = []
+
+        # Pumpkins and the player, so each entity only collides with the ones near it
+        self.broadphase = SpatialHash(24)
+        self.broadphase.insert(self.player.rect)
 
-        self.pumpkinSpawnSound = pygame.mixer.Sound("data/sounds/pumpkin.wav")
+        self.pumpkinSpawnSound = AssetCache().sound("data/sounds/pumpkin.wav", self)
 
         self.maxPumpkins = 1
         if 'maxPumpkins' in extraMapData:
@@ -63,8 +74,14 @@ class Level(GameScreen):
             for pos in extraMapData['wind']:
                 self.wind.append(pygame.Rect((pos[0], pos[1], 12, 12)))
 
-        self.text = Text()
-        self.text.loadFontImg("data/images/text.png", scale=(2,2), color=(255, 229, 127))
+        # Touching spikes and wind tiles are merged into regions
+        self.triggers = Triggers()
+        self.triggers.add('spikes', self.spikes)
+        self.triggers.add('wind', self.wind)
+        if self.levelExit != pygame.Rect((0,0,0,0)):
+            self.triggers.add('levelExit', [self.levelExit])
+
+        self.text = getFont("data/images/text.png", scale=(2,2), color=(255, 229, 127))
 
         self.levelText = None
         self.levelTextPos = [0,0]
@@ -73,7 +90,7 @@ class Level(GameScreen):
             if isinstance(extraMapData['text'][1],str):
                 self.levelTextPos = extraMapData['text'][0]
                 self.levelText = self.text.createTextSurf(extraMapData['text'][1]).copy()
-                self.text.loadFontImg("data/images/text.png", scale=(2,2))
+                self.text = getFont("data/images/text.png", scale=(2,2))
 
         self.fps = 0
 
@@ -93,17 +110,50 @@ class Level(GameScreen):
         self.alphaSurf.set_alpha(128)
 
         self.lightningTimer = 0
-        self.lightningSound = pygame.mixer.Sound("data/sounds/thunder.wav")
+        self.lightningSound = AssetCache().sound("data/sounds/thunder.wav", self)
         self.lightningSound.set_volume(0.25)
+
+        self.nextMapData = None
+
+        # Restarting puts this back instead of loading everything again
+        self.snapshot = None
+        self.snapshot = captureState(self, ('snapshot',))
     
-    def __init__(self, levelNum=1, prevScreen=None):
+    def __init__(self, levelNum=1, prevScreen=None, mapData=None):
         self.levelNum = levelNum
         self.prevScreen = prevScreen
+        self.mapData = mapData # Prefetch of readLevel for this level
         super().__init__()
     
+    def restore(self):
+        if self.snapshot is None:
+            return False
+
+        restoreState(self, self.snapshot)
+
+        self.broadphase.clear()
+        self.broadphase.insert(self.player.rect)
+        return True
+
     def togglePause(self):
         self.paused = not self.paused
 
+    def removePumpkin(self, pumpkin):
+        self.pumpkins.remove(pumpkin)
+        if pumpkin in self.awakePumpkins:
+            self.awakePumpkins.remove(pumpkin)
+        self.broadphase.remove(pumpkin.rect)
+
+        self.wakePumpkinsAbove(pumpkin.rect)
+
+    def wakePumpkinsAbove(self, rect):
+        above = pygame.Rect(rect.x, rect.y - 1, rect.w, 1)
+        for p in self.pumpkins:
+            if p.sleeping and p.rect.colliderect(above):
+                p.wake()
+                self.awakePumpkins.append(p)
+                self.wakePumpkinsAbove(p.rect)
+
     def draw(self, win):
         #if abs(((self.player.pos.x - win.get_width() / 2) - self.scroll[0]) - self.scroll[0]) > 25:
         self.scroll[0] += ((self.player.pos.x - win.get_width() / 2) - self.scroll[0]) / 20
@@ -127,9 +177,13 @@ class Level(GameScreen):
 
             self.levelExitParticles.draw(win, self.scroll)
 
-        for w in self.wind:
-            self.windParticles.emit((w.x, w.y + 12), .2)
-            #pygame.draw.rect(win, (0,128,128), (w.x - self.scroll[0], w.y - self.scroll[1], w.w, w.h))
+        # Only wind near the screen, the particles rise a few tiles before they are gone
+        windView = pygame.Rect(self.scroll[0] - 48, self.scroll[1] - 48, win.get_width() + 96, win.get_height() + 96)
+        for region in self.triggers.query(windView, 'wind'):
+            for w in region.tiles:
+                if windView.colliderect(w):
+                    self.windParticles.emit((w.x, w.y + 12), .2)
+                #pygame.draw.rect(win, (0,128,128), (w.x - self.scroll[0], w.y - self.scroll[1], w.w, w.h))
         self.windParticles.draw(win, self.scroll)
 
         if self.levelText is not None:
@@ -167,46 +221,51 @@ class Level(GameScreen):
             self.togglePause()
 
         if not self.paused:
-            entityRects = [p.rect for p in self.pumpkins]
-
             self.windParticles.update(delta)
 
-            self.player.update(delta, inp, entityRects, self.tilemap.chunks)
+            self.player.update(delta, inp, None, self.tilemap.collisionWorld, self.broadphase)
 
-            if self.player.rect.collidelist(self.wind) != -1:
+            if self.triggers.collides(self.player.rect, 'wind'):
                 dist = abs(self.player.pos.y) % 12
                 if dist < 1:
                     self.player.velocity.y -= self.windSpeed * delta * 1.4
                 self.player.velocity.y -= self.windSpeed * delta * ((max(dist, 2) / 12) * 5)
 
-            entityRects.append(self.player.rect)
+            self.broadphase.update(self.player.rect)
 
-            for p in self.pumpkins:
-                if p.rect.collidelist(self.wind) != -1:
+            # Ones falling asleep below already updated their fire this frame
+            sleepingPumpkins = [p for p in self.pumpkins if p.sleeping]
+
+            for p in self.awakePumpkins:
+                if self.triggers.collides(p.rect, 'wind'):
                     dist = abs(p.pos.y) % 12
                     p.velocity.y -= self.windSpeed * delta * ((max(dist, 2) / 12) * 5)
 
-                p.update(delta, entityRects, self.tilemap.chunks)
+                p.update(delta, None, self.tilemap.collisionWorld, self.broadphase)
+
+            for p in sleepingPumpkins:
+                p.updateFire(delta)
 
-                if p.stopping:
-                    p.stopping = False
-                    self.pumpkins.sort(key=lambda p:(p.rect.x, p.rect.y))
+            self.awakePumpkins = [p for p in self.awakePumpkins if not p.sleeping]
 
             if inp.keyJustPressed(pygame.K_x):
                 if len(self.pumpkins) + 1 <= self.maxPumpkins:
-                    self.pumpkins.append(Pumpkin(self.player.rect.x, self.player.rect.y, self.player.rect.w, self.player.rect.h, self.player.velocity, self.player.gravity, self.pumpkinImgs[random.randint(0,2)], self.jackOLanternImg))
+                    pumpkin = Pumpkin(self.player.rect.x, self.player.rect.y, self.player.rect.w, self.player.rect.h, self.player.velocity, self.player.gravity, self.pumpkinImgs[random.randint(0,2)], self.jackOLanternImg)
+                    self.pumpkins.append(pumpkin)
+                    self.awakePumpkins.append(pumpkin)
+                    self.broadphase.insert(pumpkin.rect)
                 
                     self.player.reset()
+                    self.broadphase.update(self.player.rect)
 
-                    hitlist = getCollidingRects(self.player.rect, [p.rect for p in self.pumpkins])
-                
-                    for rect in hitlist:
-                        self.pumpkins.remove(rect)
+                    # Pumpkins in the way of the respawned player are removed, the ones resting on them fall
+                    for p in [p for p in self.pumpkins if p.rect.colliderect(self.player.rect)]:
+                        self.removePumpkin(p)
                     
                     if AudioSettings().sfx:
                         self.pumpkinSpawnSound.play()
             
-            if self.player.rect.collidelist(self.spikes) != -1:
+            if self.triggers.collides(self.player.rect, 'spikes'):
                 self.player.reset()
             
             if self.levelExit != pygame.Rect((0,0,0,0)):
@@ -217,7 +276,7 @@ class Level(GameScreen):
                 self.levelExitParticles.emit((self.levelExit.x+7, self.levelExit.y+6), 0.025)
                 self.levelExitParticles.emit((self.levelExit.x+10, self.levelExit.y+3), 0.025)
 
-            if self.player.rect.colliderect(self.levelExit) and not self.ghost.active:
+            if self.triggers.collides(self.player.rect, 'levelExit') and not self.ghost.active:
                 self.ghost.activate(self.player.pos, (self.player.pos.x < 320 / 2) * 2 - 1)
                 self.player.applyGravity = False
                 self.player.applyVelocity = False
@@ -229,6 +288,9 @@ class Level(GameScreen):
                 self.lightningTimer = .25
                 if AudioSettings().sfx:
                     self.lightningSound.play()
+
+                # The next map is read while the ghost flies off instead of during the wipe
+                self.nextMapData = Prefetch(readLevel, f"data/maps/level{self.levelNum + 1}.json", True)
             
             if self.ghost.active:
                 self.player.pos = pygame.math.Vector2(self.ghost.pos.x, self.ghost.pos.y + 10)
@@ -236,7 +298,7 @@ class Level(GameScreen):
             
             if self.ghost.finished:
                 #from game.startscreen import StartScreen
-                self.screenManager.changeScreenWithTransition(Level(self.levelNum + 1, self.prevScreen))
+                self.screenManager.changeScreenWithTransition(Level(self.levelNum + 1, self.prevScreen, self.nextMapData))
             
             self.ghost.update(delta)
 
@@ -5,6 +5,7 @@ import math, copy
 from engine.entity import Entity
 from engine.animation import Animation
 from engine.common import *
+from engine.assetcache import AssetCache
 
 from game.audiosettings import AudioSettings
 
@@ -14,7 +15,7 @@ class Player(Entity):
 
         self.startPos = copy.deepcopy(self.pos)
 
-        self.imgs = loadSpriteSheet("data/images/characters/pumpkin.png", (14,14), (4,2), (1,1), 8, (0,0,0))
+        self.imgs = AssetCache().spriteSheet("data/images/characters/pumpkin.png", (14,14), (4,2), (1,1), 8, (0,0,0), self)
         self.imgGroundCycleAnim = Animation([0,4], 8, realTime=True)
         self.groundEyeFrames = [0,1,1,0]
         self.imgJumpCycleAnim = Animation([0,2], 4, realTime=True)
@@ -35,7 +36,7 @@ class Player(Entity):
         self.maxJumpVel = -math.sqrt(2 * self.gravity * maxJumpHeight)
         self.minJumpVel = -math.sqrt(2 * self.gravity * minJumpHeight)
 
-        self.jumpSound = pygame.mixer.Sound("data/sounds/jump.wav")
+        self.jumpSound = AssetCache().sound("data/sounds/jump.wav", self)
         self.jumpSound.set_volume(0.35)
 
         self.applyGravity = True
@@ -43,7 +44,7 @@ class Player(Entity):
         self.applyVelocity = True
     
     def draw(self, win, scroll=(0,0)):
-        if self.collisionTypes['bottom'] or self.velocity.y == 0:
+        if self.collisionDir & 0b0010 > 0 or self.velocity.y == 0:
             win.blit(pygame.transform.flip(self.imgs[0 + int(self.imgGroundCycleAnim.value)], self.flipped, False), (self.rect.x - scroll[0] - 1, self.rect.y - scroll[1] - 2))
             win.blit(pygame.transform.flip(self.imgs[6 + self.groundEyeFrames[int(self.imgGroundCycleAnim.value)]], self.flipped, False), (self.rect.x - scroll[0] - 1, self.rect.y - scroll[1] - 2))
         else:
@@ -52,7 +53,7 @@ class Player(Entity):
         #pygame.draw.rect(win, (255,0,0), self.rect, width=1)
         #super().drawRect(win, scroll)
     
-    def update(self, delta, inp, collisionRects=None, chunks=None):
+    def update(self, delta, inp, collisionRects=None, world=None, broadphase=None):
 
         accelerating = False
 
@@ -85,9 +86,9 @@ class Player(Entity):
             else:
                 self.velocity.x = min(self.velocity.x, 0)
 
-        super().update(delta, collisionRects, chunks)
+        super().update(delta, collisionRects, world, broadphase)
 
-        if self.collisionTypes['bottom']:
+        if self.collisionDir & 0b0010 > 0:
             self.imgGroundCycleAnim.update(delta)
 
             if self.velocity.x == 0:
@@ -105,7 +106,7 @@ class Player(Entity):
         self.jumpPressTimer -= delta
         self.groundTimer -= delta
 
-        if self.collisionTypes['bottom']:
+        if self.collisionDir & 0b0010 > 0:
             self.groundTimer = 0.1
         
         if inp.keyJustPressed(pygame.K_UP) or inp.keyJustPressed(pygame.K_c):
@@ -16,7 +16,8 @@ class Pumpkin(Entity):
         self.handleCollision = True
         self.applyVelocity = True
 
-        self.stopping = False
+        # Stopped pumpkins are left out of updates until woken
+        self.sleeping = False
 
         self.img = img
         self.jackOLanternImg = jackImg
@@ -36,28 +37,38 @@ class Pumpkin(Entity):
 
         win.blit(self.img, (self.rect.x - scroll[0] - 1, self.rect.y - scroll[1] - 2))
     
-    def update(self, delta, collisionRects=None, chunks=None):
+    def sleep(self):
+        self.sleeping = True
+
+        self.applyGravity = False
+        self.handleCollision = False
+
+        self.velocity.x = 0
+        self.velocity.y = 0
+
+    def wake(self):
+        self.sleeping = False
+
+        self.applyGravity = True
+        self.handleCollision = True
+
+    def updateFire(self, delta):
+        if self.jackOLantern:
+            self.fireParticles.update(delta)
+
+            self.fireParticles.emit((self.pos.x + 6, self.pos.y + 8), .25)
+
+    def update(self, delta, collisionRects=None, world=None, broadphase=None):
         if self.handleCollision:
-            rects = copy.deepcopy(collisionRects)
-            if self.rect in collisionRects:
-                rects.remove(self.rect)
-            super().update(delta, rects, chunks)
+            rects = None if collisionRects is None else [r for r in collisionRects if r is not self.rect]
+            super().update(delta, rects, world, broadphase)
 
             self.velocity.y = min(self.velocity.y, self.gravity * 0.75)
 
             if self.velocity.y == 0:
-                self.stopping = True
-
-                self.applyGravity = False
-                self.handleCollision = False
-
-                self.velocity.x = 0
-                self.velocity.y = 0
+                self.sleep()
         else:
             self.velocity.x = 0
             self.velocity.y = 0
         
-        if self.jackOLantern:
-            self.fireParticles.update(delta)
-
-            self.fireParticles.emit((self.pos.x + 6, self.pos.y + 8), .25)
\ No newline at end of file
+        self.updateFire(delta)
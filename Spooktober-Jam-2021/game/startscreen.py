@@ -4,8 +4,9 @@ import pygame
 
 from engine.gamescreen import GameScreen
 from engine.menu import Menu
-from engine.text import Text
+from engine.text import getFont
 from engine.common import *
+from engine.assetcache import AssetCache
 
 from game.controlsscreen import ControlsScreen
 from game.creditsscreen import CreditsScreen
@@ -17,12 +18,11 @@ class StartScreen(GameScreen):
         sys.exit()
 
     def setup(self):
-        self.text = Text()
-        self.text.loadFontImg("data/images/text.png", scale=(3,3), color=(70,214,26))
+        self.text = getFont("data/images/text.png", scale=(3,3), color=(70,214,26))
 
         self.textSurf = self.text.createTextSurf("Pumpkin Jump")
         
-        pumpkinSheet = loadSpriteSheet("data/images/characters/Pumpkin.png", (14,14), (4,2), (1,1), 8, (0,0,0))
+        pumpkinSheet = AssetCache().spriteSheet("data/images/characters/Pumpkin.png", (14,14), (4,2), (1,1), 8, (0,0,0), self)
         self.pumpkinImg = pumpkinSheet[0].copy()
         self.pumpkinImg.blit(pumpkinSheet[6], (0,0))
         self.pumpkinImg = pygame.transform.flip(pygame.transform.scale(self.pumpkinImg, (12*4, 12*4)), True, False)
@@ -4,8 +4,10 @@ import random
 
 from engine.gamescreen import GameScreen
 from engine.tilemap import Tilemap
-from engine.text import Text
+from engine.text import getFont
 from engine.common import *
+from engine.assetcache import AssetCache
+from engine.spatialhash import SpatialHash
 
 from game.player import Player
 from game.pumpkin import Pumpkin
@@ -23,12 +25,14 @@ class TestScreen(GameScreen):
 
         self.player = Player(playerSpawn[0], playerSpawn[1], 12, 12)
 
-        self.pumpkinImgs = loadSpriteSheet("data/images/pumpkins/pumpkin.png", (14,14), (4,2), (1,1), 8, (0,0,0))
+        self.pumpkinImgs = AssetCache().spriteSheet("data/images/pumpkins/pumpkin.png", (14,14), (4,2), (1,1), 8, (0,0,0), self)
         self.pumpkinImgs = [self.pumpkinImgs[0], self.pumpkinImgs[4], self.pumpkinImgs[5]]
         self.pumpkins = []
 
-        self.text = Text()
-        self.text.loadFontImg("data/images/text.png", scale=(2,2))
+        self.broadphase = SpatialHash(24)
+        self.broadphase.insert(self.player.rect)
+
+        self.text = getFont("data/images/text.png", scale=(2,2))
 
         self.fps = 0
 
@@ -56,28 +60,28 @@ class TestScreen(GameScreen):
             self.fps = int(1 / delta)
         delta = min(delta, 0.1)
 
-        entityRects = [p.rect for p in self.pumpkins]
-
-        self.player.update(delta, inp, entityRects, self.tilemap.chunks)
-
-        entityRects.append(self.player.rect)
+        self.player.update(delta, inp, None, self.tilemap.collisionWorld, self.broadphase)
+        self.broadphase.update(self.player.rect)
 
         for p in self.pumpkins:
-            p.update(delta, entityRects, self.tilemap.chunks)
-
-            if p.stopping:
-                p.stopping = False
-                self.pumpkins.sort(key=lambda p:(p.rect.x, p.rect.y))
+            p.update(delta, None, self.tilemap.collisionWorld, self.broadphase)
 
         if inp.keyJustPressed(pygame.K_x):
-            self.pumpkins.append(Pumpkin(self.player.rect.x, self.player.rect.y, self.player.rect.w, self.player.rect.h, self.player.velocity, self.player.gravity, self.pumpkinImgs[random.randint(0,2)]))
-            
+            img = self.pumpkinImgs[random.randint(0,2)]
+            pumpkin = Pumpkin(self.player.rect.x, self.player.rect.y, self.player.rect.w, self.player.rect.h, self.player.velocity, self.player.gravity, img, img)
+            self.pumpkins.append(pumpkin)
+            self.broadphase.insert(pumpkin.rect)
+
             self.player.reset()
+            self.broadphase.update(self.player.rect)
+
+            for p in [p for p in self.pumpkins if p.rect.colliderect(self.player.rect)]:
+                self.pumpkins.remove(p)
+                self.broadphase.remove(p.rect)
 
-            hitlist = getCollidingRects(self.player.rect, [p.rect for p in self.pumpkins])
-            
-            for rect in hitlist:
-                self.pumpkins.remove(rect)
+                # Anything that was resting on it falls again
+                for other in self.pumpkins:
+                    if other.sleeping:    other.wake()
 
         if inp.keyJustPressed(pygame.K_r):
             self.screenManager.reloadCurrentScreenWithTransition()
\ No newline at end of file
@@ -157,6 +157,7 @@ while mainRunning:
         elif editState == "Bucket":
             if inp.mouseJustPressed(0):
                 floodFill(tilemap.drawTiles[currentLayer], (int(mousePos   [0] / tileSize), int(mousePos[1] / tileSize)),  selectedTile)
+                tilemap.invalidate(currentLayer)
         elif editState == "Color Picker":
             win.blit(mouseBox, (mousePos[0] - scroll[0], mousePos[1] - scroll[1]))
 
@@ -175,7 +176,7 @@ while mainRunning:
 
     pygame.display.update()
 
-tilemap.generateCollision({i + 1 for i in range(15)}, True)
+tilemap.generateCollision({i + 1 for i in range(15)}, True, mergeChunks=True)
 tilemapData = tilemap.saveToJson("data/maps/test.json", False)
 
 print("Click on player spawn :)")
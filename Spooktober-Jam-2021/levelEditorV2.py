@@ -17,7 +17,7 @@ import enum, json, os
 from engine.common import *
 from engine.input import Input
 from engine.tilemap import Tilemap
-from engine.text import Text
+from engine.text import getFont
 
 class States(enum.Enum):
     PENCIL = enum.auto(),
@@ -76,8 +76,7 @@ def getSelectionTileRect():
     
     return tileRect
 
-text = Text()
-text.loadFontImg("data/images/text.png")#, scale=(2,2))
+text = getFont("data/images/text.png")#, scale=(2,2))
 
 tileImgs = loadSpriteSheet("data/images/tiles/tiles.png", (12,12), (4,4), (1, 1), 16, (0, 0, 0))
 
@@ -226,6 +225,7 @@ while running:
         elif editState == States.BUCKET:
             if inp.mouseJustPressed(0):
                 floodFill(tilemap.drawTiles[currentLayer], scrolledTileMousePos, selectedTile)
+                tilemap.invalidate(currentLayer)
         elif editState == States.COLOR_PICKER:
             if inp.mouseJustPressed(0):
                 if scrolledTileMousePos in tilemap.drawTiles[currentLayer]:
@@ -289,7 +289,7 @@ while running:
     screen.blit(sidebar, (0,0))
     pygame.display.update()
 
-tilemap.generateCollision({i + 1 for i in range(15)}, True)
+tilemap.generateCollision({i + 1 for i in range(15)}, True, mergeChunks=True)
 tilemapData = tilemap.saveToJson()
 
 for key, value in extraData.items():
@@ -0,0 +1,88 @@
+import pygame
+
+import argparse, sys, timeit, tracemalloc, types
+
+from engine.entity import Entity
+from engine.animation import Animation
+
+"""
+
+Memory and attribute access of the slotted classes against dict-backed versions of them
+
+python slotsbenchmark.py --count 10000
+
+The dict-backed version of a type has the same methods and attribute values, with the
+attributes in an ordinary instance dict. Bytes are per instance, not counting the values
+(vectors, rects, surfaces) which both versions share.
+
+"""
+
+def slotNames(cls):
+    names = []
+    for c in reversed(cls.__mro__):
+        for name in vars(c).get("__slots__", ()):
+            if name not in ("__dict__", "__weakref__"):    names.append(name)
+    return names
+
+def dictType(cls):
+    attrs = {}
+    for c in reversed(cls.__mro__[:-1]):
+        attrs.update({name: value for name, value in vars(c).items() if not name.startswith("__") and not isinstance(value, types.MemberDescriptorType)})
+    return type(cls.__name__ + "Dict", (), attrs)
+
+def copyInto(cls, obj, names):
+    new = cls.__new__(cls)
+    for name in names:
+        setattr(new, name, getattr(obj, name))
+    return new
+
+def bytesPerInstance(cls, obj, names, count):
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    objs = [copyInto(cls, obj, names) for _ in range(count)]
+    used = tracemalloc.get_traced_memory()[0] - start - sys.getsizeof(objs)
+    tracemalloc.stop()
+    return used / count
+
+def timePerCall(code, objs, number, rounds=5):
+    # Nanoseconds for each object, best of rounds, interleaved so they all see the same machine state
+    best = [None for _ in objs]
+    for _ in range(rounds):
+        for i, obj in enumerate(objs):
+            t = timeit.timeit(code, globals={"o" : obj}, number=number)
+            best[i] = t if best[i] is None else min(best[i], t)
+    return [t / number * 1e9 for t in best]
+
+def run(name, obj, accessNames, method, count, number):
+    names = slotNames(type(obj))
+    plain = copyInto(dictType(type(obj)), obj, names)
+
+    access = "; ".join(f"o.{n} = o.{n}" for n in accessNames)
+    accessTimes = timePerCall(access, (obj, plain), number)
+    methodTimes = timePerCall(method, (obj, plain), number) if method is not None else (None, None)
+
+    line = f"{name:>10} {len(names):>3} attrs"
+    for label, o, accessTime, methodTime in zip(("slots", "dict"), (obj, plain), accessTimes, methodTimes):
+        size = bytesPerInstance(type(o), obj, names, count)
+        line += f" | {label} {size:7.1f} bytes {accessTime / (len(accessNames) * 2):6.1f}ns/access"
+        if methodTime is not None:
+            line += f" {methodTime:7.1f}ns/{method[2:]}"
+    print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare slotted entity and animation classes with dict-backed ones.")
+    parser.add_argument("--count", type=int, default=10000, help="instances made to measure memory")
+    parser.add_argument("--number", type=int, default=200000, help="calls per timing")
+    args = parser.parse_args()
+
+    entity = Entity(0, 0, 12, 12)
+    # No gravity, the speed would keep growing over the timing runs
+    entity.applyVelocity = True
+    entity.velocity.update(60, -30)
+    run("Entity", entity, ("pos", "velocity", "collisionDir", "rect"), "o.update(1/60)", args.count, args.number)
+
+    anim = Animation([0, 4], 8, realTime=True)
+    run("Animation", anim, ("value", "index", "dir", "speed"), "o.update(1/60)", args.count, args.number)
+
+if __name__ == '__main__':
+    main()
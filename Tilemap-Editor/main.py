@@ -38,14 +38,13 @@ if defaultAutotile == -1:
     defaultAutotile = [i for i in range(len(tileset["tiles"])) if tileset["tiles"][i]["enableAutotile"]][0]
 
 from scripts.input import Input
-from scripts.text import Text
+from scripts.text import getFont
 from scripts.common import *
 
 inp = Input()
 inp.loadWithDictionary(profile["input"])
 
-text = Text()
-text.loadFontImg("res/text.png", scale=(2,2))
+text = getFont("res/text.png", scale=(2,2))
 
 # TILES
 tileSize = tileset["tileSize"]
@@ -197,7 +196,7 @@ elif len(sys.argv) > 1:    loadMap(sys.argv[1])
 def getSaveData():
     return {
         "drawTiles" : drawTiles,
-        "chunks" : generateChunks(drawTiles, collisionTiles, tileSize),
+        "chunks" : generateChunks(drawTiles, collisionTiles, tileSize, mergeChunks=True),
         "extraData" : extraData
     }
 
@@ -86,11 +86,33 @@ def createGrid(width, height, tileSize):
     
     return gridSurf.copy()
 
-def generateChunks(drawTiles, collidableTiles, tileSize, optimize=True, chunkSize=8):
+def generateChunks(drawTiles, collidableTiles, tileSize, optimize=True, chunkSize=8, mergeChunks=False):
     if type(collidableTiles) is not set:
         collidableTiles = set(collidableTiles)
     
     chunks = {}
+
+    if mergeChunks:
+        # Merge over the whole map, rects crossing a chunk border are added to every chunk they touch
+        tiles = []
+        for layer in drawTiles:
+            for key, i in layer.items():
+                if i in collidableTiles:
+                    pos = [int(s) for s in key.split(';')]
+                    tiles.append((pos[0] * tileSize, pos[1] * tileSize, tileSize, tileSize))
+
+        rects = optimizeTilemapCollision(tiles, tileSize) if optimize else list(set(tiles))
+
+        chunkPixels = chunkSize * tileSize
+        for rect in rects:
+            for y in range(math.floor(rect[1] / chunkPixels), math.floor((rect[1] + rect[3] - 1) / chunkPixels) + 1):
+                for x in range(math.floor(rect[0] / chunkPixels), math.floor((rect[0] + rect[2] - 1) / chunkPixels) + 1):
+                    chunkPos = f"{x};{y}"
+                    if chunkPos not in chunks:
+                        chunks[chunkPos] = []
+                    chunks[chunkPos].append(rect)
+        
+        return chunks
     
     for layer in drawTiles:
         for key, i in layer.items():
@@ -109,57 +131,32 @@ def generateChunks(drawTiles, collidableTiles, tileSize, optimize=True, chunkSiz
     
     if optimize:
         for pos, chunk in chunks.items():
-            chunk.sort(key=lambda a:(a[0], a[1]))
             chunks[pos] = optimizeTilemapCollision(chunk, tileSize)
     
     return chunks
     
 def optimizeTilemapCollision(rects, tileSize):
+    # Greedy merge right then down in sorted order, with a set of free tile positions
+    free = {(r[0], r[1]) for r in rects}
     outRects = []
-    usedRects = []
 
-    for rect in rects:
-        if rect in usedRects:
+    for x, y in sorted(free):
+        if (x, y) not in free:
             continue
+        free.remove((x, y))
 
-        width = tileSize
-        offset = 1
-        goingRight = True
-
-        while goingRight:
-            testRect = pygame.Rect(
-                (rect[0] + offset * tileSize, rect[1], tileSize, tileSize))
-
-            if testRect in rects and testRect not in usedRects:
-                width += tileSize
-                offset += 1
-
-                usedRects.append(testRect)
-            else:
-                goingRight = False
-
-        height = tileSize
-        offset = 1
-        goingDown = True
-
-        while goingDown:
-            testRects = [(rect[0] + i * tileSize, rect[1] + offset * tileSize, tileSize, tileSize) for i in range(math.floor(width / tileSize))]
-
-            for tr in testRects:
-                if tr not in rects or tr in usedRects:
-                    goingDown = False
-                    break
-
-            if not goingDown:
-                break
-
-            height += tileSize
-            offset += 1
+        right = x + tileSize
+        while (right, y) in free:
+            free.remove((right, y))
+            right += tileSize
 
-            for tr in testRects:
-                usedRects.append(tr)
+        bottom = y + tileSize
+        while all((tx, bottom) in free for tx in range(x, right, tileSize)):
+            for tx in range(x, right, tileSize):
+                free.remove((tx, bottom))
+            bottom += tileSize
 
-        outRects.append((rect[0], rect[1], width, height))
+        outRects.append((x, y, right - x, bottom - y))
 
     return outRects
 
@@ -14,10 +14,9 @@ import json, sys, os, copy
 from easygui import buttonbox
 
 from scripts.common import *
-from scripts.text import Text
+from scripts.text import getFont
 
-text = Text()
-text.loadFontImg("res/text.png", scale=(1,1))
+text = getFont("res/text.png", scale=(1,1))
 
 filePath = "labtiles.json" if len(sys.argv) <= 1 else sys.argv[1]
 